@@ -1,17 +1,157 @@
+import os
+import threading
+from collections import deque
 import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.dialogs.dialogs import Messagebox
 import numpy as np
-from sudoku import SudokuPuzzle
+from sudoku import PEERS, CandidateMasks, HintEngine, SudokuPuzzle
+from sudoku_catalogue import Catalogue
+
+# the number of puzzles the PuzzlePool keeps ready and the file it is saved to between sessions
+POOL_SIZE = 10
+POOL_PATH = os.path.join(os.path.expanduser('~'), '.sudoku-pool.npy')
+
+# the catalogue new puzzles are taken from, if it exists (see sudoku_catalogue.py)
+CATALOGUE_PATH = os.path.join(os.path.expanduser('~'), '.sudoku-catalogue.db')
+
+# how often (in ms) the App checks whether the puzzle it is waiting for is ready
+POLL_INTERVAL = 50
+
+# the row, column and box of each cell (row_idx*9 + col_idx), numbered 0-8, 9-17 and 18-26
+CELL_UNITS = [(cell // 9, 9 + cell % 9, 18 + cell // 27 * 3 + cell % 9 // 3) for cell in range(81)]
+
+# the font of the pencil marks, small enough for a 3x3 grid of digits to fit over an entry
+MARK_FONT = ('TkFixedFont', 5)
+
+class PuzzlePool:
+    '''
+    This class keeps a pool of ready-made Sudoku puzzles that a background thread refills, so that a new puzzle can be taken without waiting for one to be generated. If a puzzle catalogue exists, the pool is refilled with unserved puzzles from it, and puzzles are only generated once it runs out. The pool is saved to disk when it is stopped and loaded again when it is created, so the next session starts with ready puzzles.
+
+    Attributes
+    ----------
+    size : int
+        The number of puzzles the background thread keeps in the pool.
+
+    path : str
+        The .npy file the pool is saved to and loaded from.
+
+    catalogue_path : str
+        The catalogue database puzzles are taken from, if it exists.
+
+    puzzles : deque
+        The ready SudokuPuzzle objects.
+
+    Methods
+    -------
+    start():
+        Starts the background thread that keeps the pool filled.
+
+    fill():
+        Adds puzzles until the pool holds size of them, then waits until one is taken. Runs on the background thread.
+
+    next_puzzle(catalogue):
+        Takes a puzzle from the catalogue, or generates one.
+
+    try_pop():
+        Takes a puzzle from the pool if one is ready, without waiting.
+
+    load():
+        Loads the puzzles saved by a previous session.
+
+    save():
+        Saves the puzzles in the pool.
+
+    stop():
+        Stops the background thread and saves the pool.
+    '''
+    def __init__(self, size: int = POOL_SIZE, path: str = POOL_PATH, catalogue_path: str = CATALOGUE_PATH):
+        self.size = size
+        self.path = path
+        self.catalogue_path = catalogue_path
+        self.puzzles = deque()
+
+        self.needed = threading.Event()
+        self.stopped = threading.Event()
+        self.worker = threading.Thread(target=self.fill, daemon=True)
+
+        self.load()
+
+    def start(self) -> None:
+        '''Starts the background thread that keeps the pool filled.'''
+        self.needed.set()
+        self.worker.start()
+
+    def fill(self) -> None:
+        '''Adds puzzles until the pool holds size of them, then waits until one is taken. Runs on the background thread, which opens its own connection to the catalogue.'''
+        catalogue = Catalogue(self.catalogue_path) if self.catalogue_path and os.path.exists(self.catalogue_path) else None
+        try:
+            while not self.stopped.is_set():
+                if len(self.puzzles) < self.size:
+                    self.puzzles.append(self.next_puzzle(catalogue))
+                else:
+                    self.needed.wait()
+                    self.needed.clear()
+        finally:
+            if catalogue is not None:
+                catalogue.close()
+
+    def next_puzzle(self, catalogue: Catalogue = None) -> SudokuPuzzle:
+        '''Takes an unserved puzzle from the catalogue, or generates one if there is no catalogue or it has run out.'''
+        if catalogue is not None:
+            puzzles = catalogue.sample()
+            if len(puzzles):
+                return SudokuPuzzle.from_puzzle(puzzles[0])
+        return SudokuPuzzle()
+
+    def try_pop(self) -> SudokuPuzzle:
+        '''Takes a puzzle from the pool if one is ready, or returns None and lets the background thread add one. Never blocks, so it is safe to call on the Tk thread.'''
+        try:
+            puzzle = self.puzzles.popleft()
+        except IndexError:
+            puzzle = None
+        # wake the background thread only after taking the puzzle, so it cannot find the pool still full and go back to sleep
+        self.needed.set()
+        return puzzle
+
+    def load(self) -> None:
+        '''Loads the puzzles saved by a previous session. A missing or unreadable file, or one that does not hold an (N,9,9) array of puzzles, leaves the pool empty.'''
+        try:
+            puzzles = np.load(self.path)
+            if not (puzzles.ndim == 3 and puzzles.shape[1:] == (9, 9) and np.issubdtype(puzzles.dtype, np.integer) and np.isin(np.abs(puzzles), range(1, 10)).all()):
+                return
+            loaded = [SudokuPuzzle.from_puzzle(puzzle) for puzzle in puzzles[:self.size]]
+        except (OSError, ValueError, EOFError):
+            return
+        self.puzzles.extend(loaded)
+
+    def save(self) -> None:
+        '''Saves the puzzles in the pool as one (N,9,9) array.'''
+        puzzles = [sudoku_puzzle.puzzle for sudoku_puzzle in list(self.puzzles)]
+        try:
+            np.save(self.path, np.array(puzzles, dtype=np.int8).reshape(-1, 9, 9))
+        except OSError:
+            pass
+
+    def stop(self) -> None:
+        '''Stops the background thread and saves the pool.'''
+        self.stopped.set()
+        self.needed.set()
+        if self.worker.is_alive():
+            self.worker.join(timeout=1)
+        self.save()
 
 class SudokuBoard(ttk.Frame):
     '''
-    This class creates the Sudoku board (i.e., a 9x9 matrix) within a frame of the GUI.
+    This class creates the Sudoku board (i.e., a 9x9 matrix) within a frame of the GUI. The 9 box frames and 81 entries are created once; load() shows a new puzzle by rewriting the entries in place, so showing a puzzle costs the same however many have been played.
     
     Attributes
     ----------
     boxes : dict
-        A dictionary where the keys are the box numbers and the values are 3x3 numpy arrays. The box numbers range from 1 to 9. The numbering starts in the top, left quadrant and increases by one from left to right, top to bottom.
+        A dictionary where the keys are the box numbers and the values are 3x3 numpy arrays. The box numbers range from 1 to 9. The numbering starts in the top, left quadrant and increases by one from left to right, top to bottom. The boxes are views of the puzzle matrix (see SudokuPuzzle.puzzle_boxes), so no copies are made. Empty until a puzzle is loaded.
+
+    entries : list
+        The 81 ttkbootstrap entries, indexed by cell (row_idx*9 + col_idx).
 
     hidden_ent : list
         A list of the enabled entries (i.e., the hidden values in the Sudoku puzzle) in the Sudoku board.
@@ -19,36 +159,96 @@ class SudokuBoard(ttk.Frame):
     hidden_solution : list
         A list of the negated hidden values in the Sudoku puzzle.
 
+    hidden_cells : list
+        The cell index (row_idx*9 + col_idx) of each entry in hidden_ent.
+
+    values : list
+        The 81 values on the board (givens and the user's entries), zero for an empty cell.
+
+    placed : list
+        placed[unit][num] is the set of cells of the unit (see CELL_UNITS) that hold num, so len() of it is the unit's count of num. A count above 1 is a conflict.
+
+    conflicts : set
+        The cells that are highlighted as conflicting.
+
+    entry_cells : dict
+        The cell of each entry, keyed by the entry's widget name.
+
+    masks : CandidateMasks
+        The numbers still available in each row, column and box, from which the pencil marks are read.
+
+    marks : list
+        The 81 labels that show the pencil marks (candidates) over the empty entries.
+
+    marks_shown : bool
+        True if the pencil marks are shown.
+
+    stale_marks : set
+        The cells whose pencil marks are redrawn by the next redraw_marks() call, which is scheduled once per batch of changes.
+
     ent_validation : tuple
-        A tuple of the registered validation callback (check_value) and the substitution code (%P in this case, which indiciates that input to the check_value function will be the value of the text if keystroke is allowed.).
+        A tuple of the registered validation callback (check_value) and the substitution codes (%P, which indiciates that input to the check_value function will be the value of the text if keystroke is allowed, and %W, the name of the entry).
     
     Methods
     -------
     create_board(master):
         Vertically stacks rows of 3 boxes into the master frame. A box is a 3x3 matrix of ttkbootstrap entries.
     
-    create_box(container, box_text):
-        Creates a 3x3 matrix of ttkbootstrap entries. If the puzzle value is visible on the board, the entry is configured to the disabled state. If the puzzle value is hidden on the board, the entry is left in the configured state to allow for user input.
+    create_box(container, box_no):
+        Creates a 3x3 matrix of empty ttkbootstrap entries.
+
+    load(boxes):
+        Shows a puzzle by rewriting the text, state and validation of the entries.
 
     get_box_no(col):
         Takes a row and col index in the range [0,2] and returns the box number in the range 1-9. The box numbering starts in the top, left quadrant and increases by one from left to right, top to bottom.
 
-    check_value(cell_value):
-        Validates the user Ttkbootstrap Entry's cell_value and ensures that only integers between 1 and 9 are allowed.
+    check_value(cell_value, widget_name):
+        Validates the user Ttkbootstrap Entry's cell_value and ensures that only integers between 1 and 9 are allowed. Allowed values are passed on to set_value().
+
+    set_value(cell, num):
+        Updates the unit counts for a changed cell and the highlighting of the cells it affects.
+
+    highlight(cell):
+        Highlights a cell if its value conflicts with a peer and clears the highlight otherwise.
+
+    show_marks(shown):
+        Shows or hides the pencil marks.
+
+    refresh_marks(cells):
+        Schedules a redraw of the pencil marks of the given cells.
+
+    redraw_marks():
+        Redraws the pencil marks of the stale cells.
+
+    board_values():
+        Returns the givens and the user's entries as a 9x9 matrix.
 
     '''
-    def __init__(self, master, boxes, **kwargs):
+    def __init__(self, master, boxes=None, **kwargs):
         super().__init__(master, **kwargs)
         self.grid()
 
-        self.boxes = boxes
+        self.boxes = {}
+        self.entries = [None] * 81
         self.hidden_ent = []
         self.hidden_solution = []
+        self.hidden_cells = []
+        self.values = [0] * 81
+        self.placed = [[set() for num in range(10)] for unit in range(27)]
+        self.conflicts = set()
+        self.entry_cells = {}
+        self.masks = CandidateMasks()
+        self.marks = [None] * 81
+        self.marks_shown = False
+        self.stale_marks = set()
 
         # register the validation callback
-        self.ent_validation = (app.register(self.check_value), '%P')
+        self.ent_validation = (app.register(self.check_value), '%P', '%W')
         
         self.create_board(master=self)
+        if boxes is not None:
+            self.load(boxes)
     
     def create_board(self, master: ttk.Frame) -> None:
         '''
@@ -67,40 +267,78 @@ class SudokuBoard(ttk.Frame):
             for j in range(3):
                 frame = tk.Frame(master=master, highlightbackground='black', highlightthickness=1)
                 frame.grid(row=i, column=j)
-                box_no = self.get_box_no(row=i, col=j)
                 self.create_box(
                     container=frame,
-                    box_text=self.boxes[box_no]
+                    box_no=self.get_box_no(row=i, col=j)
                 )
 
-    def create_box(self, container: ttk.Frame, box_text: np.array) -> None:
+    def create_box(self, container: ttk.Frame, box_no: int) -> None:
         '''
-        Creates a 3x3 matrix of ttkbootstrap entries. If the puzzle value is visible on the board, the entry is configured to the disabled state. If the puzzle value is hidden on the board, the entry is left in the configured state to allow for user input.
+        Creates a 3x3 matrix of empty ttkbootstrap entries and stores them in entries.
 
         Parameters
         ----------
         container : ttk.Frame
             The master frame for the box.
-        
-        box_text : np.array
-            A 3x3 np.array that contains both the hidden and visible puzzle values. 
+
+        box_no : int
+            The box number, which ranges from 1 to 9.
 
         Return
         ------
         None
         '''
-        for i in range(box_text.shape[0]):
-            for j in range(box_text.shape[1]):
-                cell_value = '' if box_text[i][j] < 0 else box_text[i][j]
+        for i in range(3):
+            for j in range(3):
+                cell = ((box_no - 1)//3*3 + i)*9 + (box_no - 1)%3*3 + j
                 ent = ttk.Entry(master=container, width=2)
                 ent.grid(row=i, column=j)
-                ent.insert('end', cell_value)
-                if cell_value != '':
-                    ent.configure(state='disabled')
-                else:
-                    ent.config(validate='key', validatecommand=self.ent_validation)
-                    self.hidden_ent.append(ent)
-                    self.hidden_solution.append(-1*box_text[i][j])
+                self.entries[cell] = ent
+                self.entry_cells[str(ent)] = cell
+
+                # the pencil marks lie over the entry while it is empty; clicking them goes to the entry
+                mark = tk.Label(master=container, font=MARK_FONT, justify='center')
+                mark.bind('<Button-1>', lambda event, ent=ent: ent.focus_set())
+                self.marks[cell] = mark
+
+    def load(self, boxes: dict) -> None:
+        '''
+        Shows a puzzle on the existing entries. If the puzzle value is visible on the board, the entry is configured to the disabled state. If the puzzle value is hidden on the board, the entry is cleared, enabled and validated to allow for user input.
+
+        Parameters
+        ----------
+        boxes : dict
+            The boxes of the puzzle (see SudokuPuzzle.puzzle_boxes).
+
+        Return
+        ------
+        None
+        '''
+        self.boxes = boxes
+        self.hidden_ent = []
+        self.hidden_solution = []
+        self.hidden_cells = []
+        for cell in range(81):
+            if self.values[cell]:
+                self.set_value(cell, 0)
+        for box_no, box_text in boxes.items():
+            for i in range(3):
+                for j in range(3):
+                    cell = ((box_no - 1)//3*3 + i)*9 + (box_no - 1)%3*3 + j
+                    ent = self.entries[cell]
+                    # validation would reject writing a given into the entry, so it is switched off first
+                    ent.configure(state='normal', validate='none')
+                    ent.delete(0, 'end')
+                    if box_text[i][j] > 0:
+                        ent.insert('end', box_text[i][j])
+                        ent.configure(state='disabled')
+                        self.set_value(cell, int(box_text[i][j]))
+                    else:
+                        ent.configure(validate='key', validatecommand=self.ent_validation)
+                        self.hidden_ent.append(ent)
+                        self.hidden_solution.append(-1*box_text[i][j])
+                        self.hidden_cells.append(cell)
+        self.refresh_marks(range(81))
 
     def get_box_no(self, row:int, col:int) -> int:
         '''
@@ -121,14 +359,17 @@ class SudokuBoard(ttk.Frame):
         '''
         return (row * 3) + (col + 1)
     
-    def check_value(self, cell_value: str) -> bool:
+    def check_value(self, cell_value: str, widget_name: str = None) -> bool:
         '''
-        Validates the user Ttkbootstrap entries and ensures that only integers between 1 and 9 and empty string values are allowed.
+        Validates the user Ttkbootstrap entries and ensures that only integers between 1 and 9 and empty string values are allowed. An allowed value is passed on to set_value(), so the conflict highlighting follows every keystroke.
 
         Parameters
         ----------
         cell_value : str
             The value entered into the cell, aka Ttkbootstrap Entry.  
+
+        widget_name : str, optional
+            The name of the entry (see entry_cells). Defaults to None (the value is only validated).
         
         Returns
         -------
@@ -136,14 +377,147 @@ class SudokuBoard(ttk.Frame):
 
         '''
         if cell_value == '':
-            return True
+            allowed = True
         elif cell_value.isdigit():
-            if (int(cell_value) > 0) and (int(cell_value) < 10):
-                return True
-            else:
-                return False
+            allowed = 0 < int(cell_value) < 10
         else:
-            return False
+            allowed = False
+        if allowed and widget_name in self.entry_cells:
+            self.set_value(self.entry_cells[widget_name], int(cell_value or 0))
+        return allowed
+
+    def set_value(self, cell: int, num: int) -> None:
+        '''
+        Updates the counts of the cell's row, column and box for a changed value and rehighlights the cells whose conflicts may have changed: the cell and the cells of its units that hold the old or the new value. The work depends on the number of such cells, not on the size of the board.
+
+        Parameters
+        ----------
+        cell : int
+            The cell index (row_idx*9 + col_idx).
+
+        num : int
+            The new value of the cell, zero for empty.
+
+        Return
+        ------
+        None
+        '''
+        old = self.values[cell]
+        if num == old:
+            return
+        self.values[cell] = num
+
+        affected = {cell}
+        for unit in CELL_UNITS[cell]:
+            if old:
+                self.placed[unit][old].discard(cell)
+                affected |= self.placed[unit][old]
+            if num:
+                self.placed[unit][num].add(cell)
+                affected |= self.placed[unit][num]
+        for other in affected:
+            self.highlight(other)
+
+        row_idx, col_idx = divmod(cell, 9)
+        if old:
+            self.masks.remove(row_idx, col_idx, old)
+            # a conflicting copy of old keeps it used in the units of that copy
+            for unit in CELL_UNITS[cell]:
+                if self.placed[unit][old]:
+                    self.masks.place(*divmod(next(iter(self.placed[unit][old])), 9), old)
+        if num:
+            self.masks.place(row_idx, col_idx, num)
+        # only the cell and its 20 peers can have different candidates
+        self.refresh_marks([cell] + PEERS[cell])
+
+    def highlight(self, cell: int) -> None:
+        '''
+        Highlights a cell if its value appears more than once in its row, column or box, and clears the highlight otherwise.
+
+        Parameters
+        ----------
+        cell : int
+            The cell index (row_idx*9 + col_idx).
+
+        Return
+        ------
+        None
+        '''
+        num = self.values[cell]
+        conflict = bool(num) and any(len(self.placed[unit][num]) > 1 for unit in CELL_UNITS[cell])
+        if conflict == (cell in self.conflicts):
+            return
+        if conflict:
+            self.conflicts.add(cell)
+            self.entries[cell].configure(bootstyle='danger')
+        else:
+            self.conflicts.discard(cell)
+            self.entries[cell].configure(bootstyle='default')
+
+    def show_marks(self, shown: bool) -> None:
+        '''
+        Shows or hides the pencil marks.
+
+        Parameters
+        ----------
+        shown : bool
+            True to show the pencil marks and False to hide them.
+
+        Return
+        ------
+        None
+        '''
+        self.marks_shown = shown
+        self.stale_marks.update(range(81))
+        self.redraw_marks()
+
+    def refresh_marks(self, cells) -> None:
+        '''
+        Marks the pencil marks of the given cells as stale and, if no redraw is pending yet, schedules redraw_marks() for when Tk is idle. However many changes come in before then (e.g., from fast typing or loading a puzzle), they are redrawn in one go.
+
+        Parameters
+        ----------
+        cells : iterable
+            The cell indices (row_idx*9 + col_idx).
+
+        Return
+        ------
+        None
+        '''
+        if not self.marks_shown:
+            return
+        if not self.stale_marks:
+            self.after_idle(self.redraw_marks)
+        self.stale_marks.update(cells)
+
+    def redraw_marks(self) -> None:
+        '''
+        Redraws the pencil marks of the stale cells: an empty cell shows its candidates as a 3x3 grid of digits, and a filled cell (or every cell, if the marks are hidden) shows none.
+
+        Return
+        ------
+        None
+        '''
+        for cell in self.stale_marks:
+            mark = self.marks[cell]
+            if self.values[cell] or not self.marks_shown:
+                mark.place_forget()
+                continue
+            options = CandidateMasks.options(self.masks.candidates(*divmod(cell, 9)))
+            text = '\n'.join(''.join(str(num) if num in options else ' ' for num in range(row, row + 3)) for row in (1, 4, 7))
+            mark.configure(text=text)
+            mark.place(in_=self.entries[cell], x=0, y=0, relwidth=1, relheight=1)
+        self.stale_marks.clear()
+
+    def board_values(self) -> np.array:
+        '''
+        Returns the givens and the user's entries as a 9x9 matrix, with zeros for the empty cells.
+
+        Return
+        ------
+        A 9x9 np.array.
+        '''
+        return np.array(self.values).reshape(9, 9)
 
 class App(ttk.Frame):
     '''
@@ -151,11 +525,26 @@ class App(ttk.Frame):
 
     Attributes
     ----------
+    puzzle_pool : PuzzlePool
+        The pool of ready puzzles that new puzzles are taken from.
+
     sudoku_puzzle : SudokuPuzzle 
-        A SudokuPuzzle class object.
+        A SudokuPuzzle class object, or None until the first puzzle is ready.
+
+    waiting : bool
+        True while a new puzzle has been asked for and is not ready yet.
+
+    busy_indicator : ttk.Progressbar
+        The indeterminate progress bar shown while waiting for a puzzle.
+
+    show_marks : tk.BooleanVar
+        The state of the Pencil Marks toggle.
+
+    hint_engine : HintEngine
+        Finds hints for sudoku_puzzle, keeping its candidates between hints.
     
     sudoku_board : ttk.Frame
-        The ttk.Frame that contains the board that is generated from the SudokuBoard class.
+        The ttk.Frame that contains the board that is generated from the SudokuBoard class. It is created once and each new puzzle is loaded into it.
     
     left_container(master) : ttk.Frame
         This ttk.Frame that contains the sudoku_board object.
@@ -166,7 +555,7 @@ class App(ttk.Frame):
     Methods
     -------
     assemble_sudoku_board():
-        Inserts the SudokuBoard class object into the left_container of the main window.
+        Inserts the (empty) SudokuBoard class object into the left_container of the main window.
 
     settings_controls(container):
         Inserts the menu board buttons into the container of the main window.
@@ -175,17 +564,26 @@ class App(ttk.Frame):
         Clears the board of all user input.
     
     generate_new_puzzle():
-        Generates a new Sudoku puzzle.
+        Asks the puzzle pool for a new Sudoku puzzle without blocking the window.
+
+    poll_new_puzzle():
+        Shows the new puzzle once the pool has one ready, or checks again after POLL_INTERVAL ms.
     
     check_solution():
         Checks the user's inputs against the puzzle's solution.
+
+    show_hint():
+        Shows the next logical deduction and focuses its cell.
     '''
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
         self.pack(fill='both', expand=True)
 
-        self.sudoku_puzzle = SudokuPuzzle()
+        self.puzzle_pool = PuzzlePool()
+        self.puzzle_pool.start()
+        self.sudoku_puzzle = None
         self.sudoku_board = None
+        self.waiting = False
 
         self.left_container = ttk.Frame(master=self)
         self.left_container.pack(side='left', fill='both', expand=True, padx=5, pady=5)
@@ -194,12 +592,16 @@ class App(ttk.Frame):
         right_container = ttk.Frame(master=self)
         right_container.pack(fill='both', expand=True)
         self.settings_controls(container=right_container)
+        self.busy_indicator = ttk.Progressbar(master=right_container, mode='indeterminate', bootstyle='info-striped')
+
+        # the window shows up right away and the puzzle follows as soon as it is ready
+        self.generate_new_puzzle()
     
     def assemble_sudoku_board(self) -> None:
-        '''Inserts the SudokuBoard class object into the left_container of the main window.'''
+        '''Inserts the (empty) SudokuBoard class object into the left_container of the main window.'''
         self.inside_left_container = ttk.Frame(master=self.left_container)
         self.inside_left_container.pack(fill='both', expand=True)
-        self.sudoku_board = SudokuBoard(self.inside_left_container, self.sudoku_puzzle.puzzle_boxes)
+        self.sudoku_board = SudokuBoard(self.inside_left_container)
         
     def settings_controls(self, container: ttk.Frame, padx: int =5, pady: int =5) -> None:
         '''Inserts the menu board buttons into the container of the main window.'''
@@ -211,20 +613,49 @@ class App(ttk.Frame):
 
         check_soln_btn = ttk.Button(master=container, text='Check Solution', bootstyle='success', command=self.check_solution)
         check_soln_btn.pack(padx=padx, pady=pady)
+
+        hint_btn = ttk.Button(master=container, text='Hint', bootstyle='info', command=self.show_hint)
+        hint_btn.pack(padx=padx, pady=pady)
+
+        self.show_marks = tk.BooleanVar(value=False)
+        marks_toggle = ttk.Checkbutton(master=container, text='Pencil Marks', bootstyle='round-toggle', variable=self.show_marks, command=lambda: self.sudoku_board.show_marks(self.show_marks.get()))
+        marks_toggle.pack(padx=padx, pady=pady)
     
     def reset_board(self) -> None:
         '''Clears the board of all user input.'''
+        if self.sudoku_puzzle is None:
+            return
         for ent in self.sudoku_board.hidden_ent:
             ent.delete(0, 'end')
     
     def generate_new_puzzle(self) -> None:
-        '''Generates a new Sudoku puzzle.'''
-        self.inside_left_container.pack_forget()
-        self.sudoku_puzzle = SudokuPuzzle()
-        self.assemble_sudoku_board()
+        '''Asks the puzzle pool for a new Sudoku puzzle without blocking the window. Puzzles are generated on the pool's background thread; while waiting, the busy indicator runs and further clicks are coalesced into the pending request.'''
+        if self.waiting:
+            return
+        self.waiting = True
+        self.busy_indicator.pack(padx=5, pady=5, fill='x')
+        self.busy_indicator.start()
+        self.poll_new_puzzle()
+
+    def poll_new_puzzle(self) -> None:
+        '''Shows the new puzzle once the pool has one ready, or checks again after POLL_INTERVAL ms.'''
+        sudoku_puzzle = self.puzzle_pool.try_pop()
+        if sudoku_puzzle is None:
+            self.after(POLL_INTERVAL, self.poll_new_puzzle)
+            return
+
+        self.busy_indicator.stop()
+        self.busy_indicator.pack_forget()
+        self.waiting = False
+
+        self.sudoku_puzzle = sudoku_puzzle
+        self.sudoku_board.load(sudoku_puzzle.puzzle_boxes)
+        self.hint_engine = HintEngine(sudoku_puzzle.puzzle)
     
     def check_solution(self) -> None:
         '''Checks the user's inputs against the puzzle's solution.'''
+        if self.sudoku_puzzle is None:
+            return
         user_input = []
         for ent in self.sudoku_board.hidden_ent:
             if ent.get() == '':
@@ -244,7 +675,29 @@ class App(ttk.Frame):
             message = 'Uh-Oh. It looks like you need to try again.'
             Messagebox.ok(message=message, title='Try Again.')
 
+    def show_hint(self) -> None:
+        '''Shows the next logical deduction and focuses its cell.'''
+        if self.sudoku_puzzle is None:
+            return
+        step = self.hint_engine.hint(self.sudoku_board.board_values())
+        if step is None:
+            if self.hint_engine.mistakes:
+                message = f'{len(self.hint_engine.mistakes)} of your entries are wrong. Fix them to get a hint.'
+            elif self.hint_engine.status == 'solved':
+                message = 'The board is full. Check your solution!'
+            else:
+                message = "Sorry, there is no hint for this board. The next step needs more than the techniques I know."
+            Messagebox.ok(message=message, title='Hint')
+            return
+
+        cell, num = step.placements[0]
+        row_idx, col_idx = divmod(cell, 9)
+        message = f'Try a {num} in row {row_idx + 1}, column {col_idx + 1} ({step.technique}).'
+        Messagebox.ok(message=message, title='Hint')
+        self.sudoku_board.hidden_ent[self.sudoku_board.hidden_cells.index(cell)].focus_set()
+
 if __name__=='__main__':
     app = ttk.Window(title="Let's Play Sudoku!")
-    App(app)
-    app.mainloop()
\ No newline at end of file
+    sudoku_app = App(app)
+    app.mainloop()
+    sudoku_app.puzzle_pool.stop()
@@ -1,19 +1,549 @@
 #%%
+import argparse
 import numpy as np 
-import random
-from copy import deepcopy
-    
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import cache
+from hashlib import blake2b
+from itertools import combinations, islice
+from operator import getitem, itemgetter
+from typing import Iterator, NamedTuple
+
+# bit (num-1) of a mask is set when num is still available
+ALL_CANDIDATES = 0b111111111
+
+# the clue layouts supported by clue_orbits()
+SYMMETRIES = ('none', 'rotational', 'mirror', 'diagonal')
+
+# the number of clues left by hide_num_across_board(), also used for symmetric puzzles without a clue count
+DEFAULT_CLUES = 54
+
+# a valid solution that the 'transform' strategy of SudokuSolution shuffles
+BASE_SOLUTION = np.array([[(row_idx*3 + row_idx//3 + col_idx) % 9 + 1 for col_idx in range(9)] for row_idx in range(9)])
+
+def puzzle_rng(seed: int, index: int) -> np.random.Generator:
+    '''
+    Returns the random number generator for puzzle number index of a run seeded with seed. The generator is seeded with the index-th child of SeedSequence(seed).spawn(), but it is built directly from (seed, index), so any worker can create it without knowing how the run was split up. The same (seed, index) pair therefore produces the same puzzle on any machine and with any number of workers.
+
+    Parameters
+    ----------
+    seed : int
+        The seed of the run.
+
+    index : int
+        The index of the puzzle within the run.
+
+    Return
+    ------
+    A np.random.Generator.
+    '''
+    return np.random.Generator(np.random.PCG64(np.random.SeedSequence(seed, spawn_key=(index,))))
+
+class RandomStream:
+    '''
+    Draws random numbers from a np.random.Generator in batches. Asking a Generator for one number at a time is slow, so batch_size uniform numbers are drawn at once and handed out one by one.
+
+    Attributes
+    ----------
+    generator : np.random.Generator
+        The underlying generator.
+
+    batch_size : int
+        The number of uniform numbers drawn at a time.
+
+    Methods
+    -------
+    random():
+        Returns a uniform float in [0, 1).
+
+    integers(n):
+        Returns a uniform integer in [0, n).
+
+    choice(items):
+        Returns a uniformly chosen element of items.
+
+    shuffle(items):
+        Shuffles a list in place.
+
+    permutation(n):
+        Returns a random permutation of range(n) as a list.
+    '''
+    batch_size = 256
+
+    def __init__(self, generator: np.random.Generator | int = None) -> None:
+        if not isinstance(generator, np.random.Generator):
+            generator = np.random.default_rng(generator)
+        self.generator = generator
+        self.batch = []
+
+    def random(self) -> float:
+        '''Returns a uniform float in [0, 1).'''
+        if not self.batch:
+            self.batch = self.generator.random(self.batch_size).tolist()
+        return self.batch.pop()
+
+    def integers(self, n: int) -> int:
+        '''Returns a uniform integer in [0, n).'''
+        return int(self.random() * n)
+
+    def choice(self, items):
+        '''Returns a uniformly chosen element of items (a sequence or array).'''
+        return items[self.integers(len(items))]
+
+    def shuffle(self, items: list) -> None:
+        '''Shuffles a list in place (Fisher-Yates).'''
+        for idx in range(len(items) - 1, 0, -1):
+            other = self.integers(idx + 1)
+            items[idx], items[other] = items[other], items[idx]
+
+    def permutation(self, n: int) -> list[int]:
+        '''Returns a random permutation of range(n) as a list.'''
+        items = list(range(n))
+        self.shuffle(items)
+        return items
+
+class SolveResult(NamedTuple):
+    '''
+    The outcome of SudokuPuzzle.solve_puzzle().
+
+    Attributes
+    ----------
+    status : str
+        One of 'solved' (no hidden cells remain), 'stuck' (a sweep over the hidden cells filled none of them), 'contradiction' (a hidden cell has no options left) or 'out of budget' (the iteration budget ran out first).
+
+    iterations : int
+        The number of sweeps over the hidden cells that were made.
+    '''
+    status: str
+    iterations: int
+
+class CandidateMasks:
+    '''
+    Tracks the numbers that are still available in each row, column and box of a 9x9 matrix using 9-bit masks. Bit (num-1) of a mask is set when num has not been placed in that row, column or box yet, so the candidates of a cell are found with a single AND of its row, column and box masks.
+
+    Attributes
+    ----------
+    row_masks : list
+        A list of 9 integers holding the numbers still available in each row of the matrix.
+
+    col_masks : list
+        A list of 9 integers holding the numbers still available in each column of the matrix.
+
+    box_masks : list
+        A list of 9 integers holding the numbers still available in each box of the matrix. The boxes are indexed from 0 to 8, starting in the top, left quadrant and increasing by one from left to right, top to bottom.
+
+    Methods
+    -------
+    box_index(row_idx, col_idx):
+        Takes a row and column index of the matrix and returns the index (0-8) of the box that contains the cell.
+
+    place(row_idx, col_idx, num):
+        Marks num as used in the row, column and box of the given cell.
+
+    remove(row_idx, col_idx, num):
+        Marks num as available again in the row, column and box of the given cell.
+
+    candidates(row_idx, col_idx):
+        Returns the mask of numbers that can be placed in the given cell.
+
+    options(mask):
+        Converts a candidate mask into the list of numbers it contains.
+    '''
+    def __init__(self, matrix: np.array = None) -> None:
+        self.row_masks = [ALL_CANDIDATES] * 9
+        self.col_masks = [ALL_CANDIDATES] * 9
+        self.box_masks = [ALL_CANDIDATES] * 9
+
+        if matrix is not None:
+            # only the positive (i.e., visible) values are known
+            for row_idx, col_idx in np.argwhere(matrix > 0):
+                self.place(row_idx, col_idx, int(matrix[row_idx, col_idx]))
+
+    @staticmethod
+    def box_index(row_idx: int, col_idx: int) -> int:
+        '''
+        Takes a row and column index of the matrix and returns the index (0-8) of the box that contains the cell.
+
+        Parameters
+        ----------
+        row_idx : int
+            A row index of the matrix. Range: [0,9).
+
+        col_idx : int
+            A column index of the matrix. Range: [0,9).
+
+        Return
+        ------
+        The box index (int) in the range [0,9).
+        '''
+        return (row_idx // 3) * 3 + col_idx // 3
+
+    def place(self, row_idx: int, col_idx: int, num: int) -> None:
+        '''
+        Marks num as used in the row, column and box of the given cell.
+
+        Parameters
+        ----------
+        row_idx : int
+            A row index of the matrix. Range: [0,9).
+
+        col_idx : int
+            A column index of the matrix. Range: [0,9).
+
+        num : int
+            The number placed in the cell. Range: [1,9].
+
+        Return
+        ------
+        None
+        '''
+        bit = ~(1 << (num - 1))
+        self.row_masks[row_idx] &= bit
+        self.col_masks[col_idx] &= bit
+        self.box_masks[self.box_index(row_idx, col_idx)] &= bit
+
+    def remove(self, row_idx: int, col_idx: int, num: int) -> None:
+        '''
+        Marks num as available again in the row, column and box of the given cell.
+
+        Parameters
+        ----------
+        row_idx : int
+            A row index of the matrix. Range: [0,9).
+
+        col_idx : int
+            A column index of the matrix. Range: [0,9).
+
+        num : int
+            The number removed from the cell. Range: [1,9].
+
+        Return
+        ------
+        None
+        '''
+        bit = 1 << (num - 1)
+        self.row_masks[row_idx] |= bit
+        self.col_masks[col_idx] |= bit
+        self.box_masks[self.box_index(row_idx, col_idx)] |= bit
+
+    def candidates(self, row_idx: int, col_idx: int) -> int:
+        '''
+        Returns the mask of numbers that can be placed in the given cell.
+
+        Parameters
+        ----------
+        row_idx : int
+            A row index of the matrix. Range: [0,9).
+
+        col_idx : int
+            A column index of the matrix. Range: [0,9).
+
+        Return
+        ------
+        A 9-bit mask (int) where bit (num-1) is set if num is a candidate for the cell.
+        '''
+        return self.row_masks[row_idx] & self.col_masks[col_idx] & self.box_masks[self.box_index(row_idx, col_idx)]
+
+    @staticmethod
+    def options(mask: int) -> list[int]:
+        '''
+        Converts a candidate mask into the list of numbers it contains.
+
+        Parameters
+        ----------
+        mask : int
+            A 9-bit candidate mask.
+
+        Return
+        ------
+        A sorted list of the numbers (int) in the mask.
+        '''
+        nums, mask = [], int(mask)
+        while mask:
+            bit = mask & -mask
+            nums.append(bit.bit_length())
+            mask ^= bit
+        return nums
+
+def box_view(matrix: np.array) -> np.array:
+    '''
+    Returns a (3,3,3,3) strided view of a 9x9 matrix where element [i, j] is the 3x3 box in the i-th row and j-th column of boxes. No data is copied, so writing to the view writes to the matrix.
+
+    Parameters
+    ----------
+    matrix : np.array
+        A 9x9 numpy array.
+
+    Return
+    ------
+    A (3,3,3,3) np.array view of the matrix.
+    '''
+    row_stride, col_stride = matrix.strides
+    return np.lib.stride_tricks.as_strided(
+        matrix,
+        shape=(3, 3, 3, 3),
+        strides=(3*row_stride, 3*col_stride, row_stride, col_stride),
+        writeable=matrix.flags.writeable,
+    )
+
+def matrix_boxes(matrix: np.array) -> dict:
+    '''
+    Splits a 9x9 matrix into a dictionary of its boxes without copying it. The keys are the box numbers (1-9), numbered from the top, left quadrant and increasing by one from left to right, top to bottom, and the values are 3x3 views of the matrix (see box_view()).
+
+    Parameters
+    ----------
+    matrix : np.array
+        A 9x9 numpy array.
+
+    Return
+    ------
+    A dictionary of 3x3 np.array views.
+    '''
+    boxes = box_view(matrix)
+    return {row*3 + col + 1: boxes[row, col] for row in range(3) for col in range(3)}
+
+def count_solutions(matrix: np.array, limit: int = 2) -> int:
+    '''
+    Counts the solutions of a 9x9 puzzle with a backtracking search, stopping as soon as limit solutions have been found. Before each guess, every hidden cell with a single candidate is filled in (constraint propagation) and the search branches on the hidden cell with the fewest candidates. With the default limit of 2 this answers whether a puzzle has exactly one solution without enumerating the others.
+
+    Parameters
+    ----------
+    matrix : np.array
+        A 9x9 puzzle. Negative or zero values are unknown.
+
+    limit : int, optional
+        The number of solutions after which the search stops. Defaults to 2.
+
+    Return
+    ------
+    The number of solutions (int) found, which is at most limit. Zero if the visible values conflict.
+    '''
+    masks = CandidateMasks()
+    hidden_values = []
+    for row_idx in range(9):
+        for col_idx in range(9):
+            num = int(matrix[row_idx, col_idx])
+            if num > 0:
+                if not masks.candidates(row_idx, col_idx) & (1 << (num - 1)):
+                    return 0
+                masks.place(row_idx, col_idx, num)
+            else:
+                hidden_values.append((row_idx, col_idx))
+
+    return _count_from(masks, hidden_values, limit)
+
+def _count_from(masks: CandidateMasks, hidden_values: list, limit: int) -> int:
+    '''
+    Recursive step of count_solutions(). The masks are restored to their original state before returning.
+
+    Parameters
+    ----------
+    masks : CandidateMasks
+        The candidate masks of the current (partial) board.
+
+    hidden_values : list
+        A list of the (row_idx, col_idx) coordinates that are still hidden.
+
+    limit : int
+        The number of solutions after which the search stops.
+
+    Return
+    ------
+    The number of solutions (int) found, which is at most limit.
+    '''
+    placed = []
+    count = 0
+    progress = True
+    while progress and hidden_values:
+        progress = False
+        best_cell = None
+        best_options = 0
+        best_size = 10
+        still_hidden = []
+        for row_idx, col_idx in hidden_values:
+            num_options = masks.candidates(row_idx, col_idx)
+            if not num_options:
+                # contradiction: undo the propagation and give up on this branch
+                for cell in placed:
+                    masks.remove(*cell)
+                return 0
+            if not (num_options & (num_options-1)):
+                num = num_options.bit_length()
+                masks.place(row_idx, col_idx, num)
+                placed.append((row_idx, col_idx, num))
+                progress = True
+            else:
+                still_hidden.append((row_idx, col_idx))
+                size = num_options.bit_count()
+                if size < best_size:
+                    best_cell, best_options, best_size = (row_idx, col_idx), num_options, size
+        hidden_values = still_hidden
+
+    if not hidden_values:
+        count = 1
+    else:
+        # branch on the hidden cell with the fewest options
+        row_idx, col_idx = best_cell
+        others = [cell for cell in hidden_values if cell != best_cell]
+        while best_options and count < limit:
+            bit = best_options & -best_options
+            best_options ^= bit
+            num = bit.bit_length()
+            masks.place(row_idx, col_idx, num)
+            count += _count_from(masks, others, limit - count)
+            masks.remove(row_idx, col_idx, num)
+
+    for cell in placed:
+        masks.remove(*cell)
+    return count
+
+def clue_orbits(symmetry: str = 'none') -> list[tuple]:
+    '''
+    Groups the 81 cells of the matrix into orbits that must be hidden or shown together to keep the given symmetry. The cells are indexed row by row, i.e., cell (row_idx, col_idx) is row_idx*9 + col_idx.
+
+    Parameters
+    ----------
+    symmetry : str, optional
+        One of SYMMETRIES: 'none' (every cell is its own orbit), 'rotational' (a cell and its 180 degree rotation), 'mirror' (a cell and its reflection across the middle column) or 'diagonal' (a cell and its reflection across the main diagonal). Defaults to 'none'.
+
+    Return
+    ------
+    A list of tuples of cell indices (int).
+    '''
+    if symmetry not in SYMMETRIES:
+        raise ValueError(f'symmetry must be one of {SYMMETRIES}, not {symmetry!r}')
+
+    orbits = []
+    seen = set()
+    for cell in range(81):
+        if cell in seen:
+            continue
+        row_idx, col_idx = divmod(cell, 9)
+        images = {(row_idx, col_idx)}
+        if symmetry == 'rotational':
+            images.add((8 - row_idx, 8 - col_idx))
+        elif symmetry == 'mirror':
+            images.add((row_idx, 8 - col_idx))
+        elif symmetry == 'diagonal':
+            images.add((col_idx, row_idx))
+
+        orbit = tuple(sorted(row*9 + col for row, col in images))
+        seen.update(orbit)
+        orbits.append(orbit)
+    return orbits
+
+class SolutionCounter:
+    '''
+    Counts the solutions of a puzzle whose clues are removed (or restored) one group at a time. The candidate masks and the list of hidden cells are updated incrementally as clues change, so each count starts from the current propagation state instead of rebuilding it from the matrix.
+
+    Attributes
+    ----------
+    solution : np.array
+        The 9x9 solution whose values are used as clues.
+
+    masks : CandidateMasks
+        The candidate masks of the current clues.
+
+    hidden_values : list
+        A list of the (row_idx, col_idx) coordinates of the cells that are not clues.
+
+    Methods
+    -------
+    remove(cells):
+        Turns the given cells from clues into hidden cells.
+
+    restore(cells):
+        Turns the given hidden cells back into clues.
+
+    count(limit=2):
+        Counts the solutions of the current clues, stopping once limit solutions have been found.
+    '''
+    def __init__(self, solution: np.array) -> None:
+        self.solution = np.asarray(solution)
+        self.masks = CandidateMasks(self.solution)
+        self.hidden_values = []
+
+    def remove(self, cells: tuple) -> None:
+        '''
+        Turns the given cells from clues into hidden cells.
+
+        Parameters
+        ----------
+        cells : tuple
+            The indices (row_idx*9 + col_idx) of the cells to hide.
+
+        Return
+        ------
+        None
+        '''
+        for cell in cells:
+            row_idx, col_idx = divmod(cell, 9)
+            self.masks.remove(row_idx, col_idx, int(self.solution[row_idx, col_idx]))
+            self.hidden_values.append((row_idx, col_idx))
+
+    def restore(self, cells: tuple) -> None:
+        '''
+        Turns the given hidden cells back into clues.
+
+        Parameters
+        ----------
+        cells : tuple
+            The indices (row_idx*9 + col_idx) of the cells to show.
+
+        Return
+        ------
+        None
+        '''
+        for cell in cells:
+            row_idx, col_idx = divmod(cell, 9)
+            self.masks.place(row_idx, col_idx, int(self.solution[row_idx, col_idx]))
+            self.hidden_values.remove((row_idx, col_idx))
+
+    def count(self, limit: int = 2) -> int:
+        '''
+        Counts the solutions of the current clues, stopping once limit solutions have been found. The masks are unchanged afterwards.
+
+        Parameters
+        ----------
+        limit : int, optional
+            The number of solutions after which the search stops. Defaults to 2.
+
+        Return
+        ------
+        The number of solutions (int) found, which is at most limit.
+        '''
+        return _count_from(self.masks, self.hidden_values, limit)
+
 class SudokuSolution:
     '''
     Create the solution to a valid Sudoku puzzle. 
 
+    The solution is built with one of two strategies. The 'placement' strategy (the default) places each number in each box at random, pulling back whenever a number cannot be placed. The 'transform' strategy starts from BASE_SOLUTION and applies random transformations that keep the solution valid, which takes a fixed, small amount of work.
+
+    The grid attribute (a flat array of the 81 cells, row by row) is the only copy of the board. The matrix attribute is a read-only view of it and the boxes attribute is a dictionary of views that can be written to. Both are created when they are accessed, so writing a cell never copies the board.
+
     Attributes
     ----------
+    strategy : str
+        The strategy used to build the solution, either 'placement' or 'transform'.
+
+    rng : RandomStream
+        The source of all the randomness used to build the solution (and, in SudokuPuzzle, the puzzle). Created from the rng parameter, which can be a np.random.Generator (e.g., from puzzle_rng()), a seed or None for a fresh, unpredictable stream.
+
+    grid : np.array
+        A contiguous array of the 81 cells of the board, row by row. Cell (row_idx, col_idx) is grid[row_idx*9 + col_idx].
+
+    assignments : dict
+        An undo log used by the 'placement' strategy. The keys are numbers (1-9) and the values are lists of the grid indices where that number was placed. Dummy values are not logged, as they only ever belong to the number currently being assigned and are found by their value. The log is emptied once the solution is complete.
+
     boxes : dict
-        A dictionary where the keys are the box numbers and the values are 3x3 numpy arrays. The box numbers range from 1 to 9. The numbering starts in the top, left quadrant and increases by one from left to right, top to bottom.
+        A view of the grid as a dictionary where the keys are the box numbers and the values are 3x3 numpy arrays. Writing to a box writes to the grid (and therefore the matrix). The box numbers range from 1 to 9. The numbering starts in the top, left quadrant and increases by one from left to right, top to bottom.
 
     matrix : np.array
-        A 9x9 matrix of the form:
+        A read-only 9x9 view of the grid of the form:
             boxes[1] | boxes[2] | boxes[3]
             ---------|----------|---------
             boxes[4] | boxes[5] | boxes[6]
@@ -24,15 +554,10 @@ class SudokuSolution:
     Methods
     -------
     stack(): 
-        Stacks the boxes such that a 9x9 matrix is generated with the form below (i.e., the matrix attribute).
-                boxes[1] | boxes[2] | boxes[3]
-                ---------|----------|---------
-                boxes[4] | boxes[5] | boxes[6]
-                ---------|----------|---------
-                boxes[7] | boxes[8] | boxes[9]  
+        Kept for backwards compatibility. The matrix attribute is always a view of the grid, so there is nothing to stack.
     
     unstack(): 
-        Unstacks the matrix such that it is converted to a dictionary of boxes (i.e., the boxes attribute).
+        Kept for backwards compatibility. The boxes attribute is always a view of the grid, so there is nothing to unstack.
 
     print_matrix (matrix=None): 
         Prints the provided 9x9 numpy array to the command line in the form of a standard Sudoku board. If the matrix parameter is not given, the function will print the matrix attribute. 
@@ -41,55 +566,76 @@ class SudokuSolution:
         Takes the box_no and returns a tuple of the form (row_add, col_add) containing values that should be added to the row index and column index, respectively, of the box (a 3x3 matrix) to account for the box's place in the 9x9 matrix. For example, the center coordintate for box number 6 has the coordinates (1,1) in the box form (a 3x3 matrix), whereas it will have the coordinates (1+3, 1+6) = (4,7) in the matrix form.
 
     assign_num_to_cell(available_indices, box_no, num): 
-        Randomly selects a row and column index from the given available_indicies and assigns the given num to the selected row, column index. The box assignment is passed to the matrix attribute using the stack() method. Dummy values (10s) are assigned to the empty cells in the selected row and columns in the matrix to prevent an invalid number assignment. The dummy values are passed back to the box attribute using the unstack() method.   
+        Randomly selects a row and column index from the given available_indicies and assigns the given num to the selected row, column index of the grid. Dummy values (10s) are assigned to the empty cells in the selected row and columns to prevent an invalid number assignment. The cell is recorded in the assignments undo log.   
 
     remove_dummies(): 
-        Removes the dummies from the boxes and the matrix attributes that were assigned using the assign_num_to_cell() method.
+        Removes the dummies from the grid that were assigned using the assign_num_to_cell() method.
 
     pull_back(num): 
-        Resets the boxes and matrix attributes to the previous number iteration and starts the assignments again for the current number.
+        Undoes the cells logged for num and every later number and removes the dummies, so that the assignments start again for num.
     
     box_assignments(): 
         Iterates through each possible number assignment (i.e., 1-9) and each box in boxes and assigns a number to each box until a valid Sudoku puzzle solution is generated.
+
+    transform_assignments():
+        Generates a valid Sudoku puzzle solution by relabeling the numbers of BASE_SOLUTION and shuffling its rows, columns, bands and stacks.
     
     '''
-    def __init__(self) -> None:
-        self.boxes = {i:np.zeros((3,3), dtype=int) for i in range(1,10)}
-        self.matrix = None
-        self.assignments = {0: {i:np.zeros((3,3), dtype=int) for i in range(1,10)}}
+    strategies = ('placement', 'transform')
+
+    def __init__(self, strategy: str = 'placement', rng: np.random.Generator | int = None) -> None:
+        if strategy not in self.strategies:
+            raise ValueError(f'strategy must be one of {self.strategies}, not {strategy!r}')
 
-        self.box_assignments()
+        self.strategy = strategy
+        self.rng = rng if isinstance(rng, RandomStream) else RandomStream(rng)
+        self.grid = np.zeros(81, dtype=int)
+        self.assignments = {}
+
+        if strategy == 'transform':
+            self.transform_assignments()
+        else:
+            self.box_assignments()
+
+    @property
+    def matrix(self) -> np.array:
+        '''A read-only 9x9 view of the grid.'''
+        matrix = self.grid.reshape(9, 9)
+        matrix.flags.writeable = False
+        return matrix
+
+    @matrix.setter
+    def matrix(self, matrix: np.array) -> None:
+        self.grid[:] = np.asarray(matrix).ravel()
+
+    @property
+    def boxes(self) -> dict:
+        '''A dictionary of 3x3 views of the grid, keyed by box number (1-9). Writing to a box writes to the grid.'''
+        return matrix_boxes(self.grid.reshape(9, 9))
+
+    @boxes.setter
+    def boxes(self, boxes: dict) -> None:
+        views = self.boxes
+        for box_no, box in boxes.items():
+            views[box_no][...] = box
 
     def stack(self) -> None:
         '''
-        Stacks the boxes such that a 9x9 matrix is generated with the form below (i.e., the matrix attribute).
-            boxes[1] | boxes[2] | boxes[3]
-            ---------|----------|---------
-            boxes[4] | boxes[5] | boxes[6]
-            ---------|----------|---------
-            boxes[7] | boxes[8] | boxes[9]
+        Kept for backwards compatibility. The matrix attribute is always a view of the grid, so there is nothing to stack.
         
         Returns
         -------
         None
         '''
-        row1 = np.hstack([self.boxes[1], self.boxes[2], self.boxes[3]])
-        row2 = np.hstack([self.boxes[4], self.boxes[5], self.boxes[6]])
-        row3 = np.hstack([self.boxes[7], self.boxes[8], self.boxes[9]])
-        self.matrix = np.vstack([row1, row2, row3])
 
     def unstack(self) -> None:
         '''
-        Unstacks the matrix such that it is converted to a dictionary of boxes (i.e., the boxes attribute).
+        Kept for backwards compatibility. The boxes attribute is always a view of the grid, so there is nothing to unstack.
         
         Returns
         -------
         None
         '''
-        row1, row2, row3 = np.vsplit(self.matrix,3)
-        self.boxes[1], self.boxes[2], self.boxes[3] = np.hsplit(row1, 3)
-        self.boxes[4], self.boxes[5], self.boxes[6] = np.hsplit(row2, 3)
-        self.boxes[7], self.boxes[8], self.boxes[9] = np.hsplit(row3, 3)
 
     def print_matrix(self, matrix: np.array = None) -> None:
         '''
@@ -144,7 +690,7 @@ class SudokuSolution:
 
     def assign_num_to_cell(self, available_indices: np.array, box_no: int, num: int) -> None:
         '''
-        Randomly selects a row and column index from the given available_indicies and assigns the given num to the selected row, column index. The box assignment is passed to the matrix attribute using the stack() method. Dummy values (10s) are assigned to the empty cells in the selected row and columns in the matrix to prevent an invalid number assignment. The dummy values are passed back to the box attribute using the unstack() method.
+        Randomly selects a row and column index from the given available_indicies and assigns the given num to the selected row, column index of the grid. Dummy values (10s) are assigned to the empty cells in the selected row and columns to prevent an invalid number assignment. The index of the cell is appended to the assignments undo log for num.
 
         Parameters
         ----------
@@ -163,43 +709,39 @@ class SudokuSolution:
         
         '''
         # randomly chosen index
-        row_idx, col_idx = random.choice(available_indices)
-        
-        # assign num to cell
-        self.boxes[box_no][row_idx, col_idx] = num
-
-        # stack the boxes into a matrix
-        self.stack()
+        row_idx, col_idx = self.rng.choice(available_indices)
 
         # update randomly chosen index to get matrix index
         row_add, col_add = self.row_col_add(box_no)
         row_idx+= row_add
         col_idx+= col_add
 
-        # rows & col no longer available to current num
-        row = self.matrix[row_idx,:]
+        # assign num to cell
+        cell = row_idx*9 + col_idx
+        self.grid[cell] = num
+
+        # rows & col no longer available to current num (both are views of the grid)
+        row = self.grid[row_idx*9:(row_idx+1)*9]
         row[row==0]=10
 
-        col = self.matrix[:,col_idx]
+        col = self.grid[col_idx::9]
         col[col==0]=10
 
-        self.unstack()
+        self.assignments.setdefault(num, []).append(cell)
 
     def remove_dummies(self) -> None:
         '''
-        Removes the dummies from the boxes and the matrix attributes that were assigned using the assign_num_to_cell() method.
+        Removes the dummies from the grid that were assigned using the assign_num_to_cell() method.
         
         Return
         ------
         None
         '''
-        self.stack()
-        self.matrix[self.matrix==10] = 0
-        self.unstack()
+        self.grid[self.grid==10] = 0
 
     def pull_back(self, num: int) -> None:
         '''
-        Resets the boxes and matrix attributes to the previous number iteration and starts the assignments again for the current number.
+        Undoes the cells logged for num and every later number and removes the dummies, which resets the grid to the previous number iteration so that the assignments start again for num. Every logged cell was empty before it was written, so undoing a write sets the cell back to 0.
         
         Parameter
         ---------
@@ -210,8 +752,9 @@ class SudokuSolution:
         ------
         None
         '''
-        self.boxes = deepcopy(self.assignments[num-1])
-        self.stack()
+        cells = [cell for logged_num in range(num, 10) for cell in self.assignments.pop(logged_num, [])]
+        self.grid[cells] = 0
+        self.remove_dummies()
         return
 
     def box_assignments(self) -> None:
@@ -222,11 +765,13 @@ class SudokuSolution:
         ------
         None
         '''
+        # the box views stay valid as the grid is only ever written in place
+        boxes = self.boxes
         num = 1
         box_no = 1
         while num<10:
             while box_no<10:
-                box = self.boxes[box_no]
+                box = boxes[box_no]
                 available_indices = np.argwhere(box==0)
 
                 if available_indices.size > 0:
@@ -241,14 +786,36 @@ class SudokuSolution:
 
             self.remove_dummies()
 
-            self.assignments[num] = deepcopy(self.boxes)
-
             num+=1
             box_no=1
 
+        self.assignments.clear()
+
+    def transform_assignments(self) -> None:
+        '''
+        Generates a valid Sudoku puzzle solution by applying random validity-preserving transformations to BASE_SOLUTION: relabeling the numbers, shuffling the rows within each band (a row of boxes), the columns within each stack (a column of boxes), the bands and the stacks, and transposing the matrix.
+
+        Return
+        ------
+        None
+        '''
+        # relabel the numbers
+        labels = np.array(self.rng.permutation(9)) + 1
+        matrix = labels[BASE_SOLUTION - 1]
+
+        # shuffle the bands and the rows within each band, then the stacks and the columns within each stack
+        row_order = [band*3 + row for band in self.rng.permutation(3) for row in self.rng.permutation(3)]
+        col_order = [stack*3 + col for stack in self.rng.permutation(3) for col in self.rng.permutation(3)]
+        matrix = matrix[row_order][:, col_order]
+
+        if self.rng.random() < 0.5:
+            matrix = matrix.T
+
+        self.matrix = matrix
+
 class SudokuPuzzle(SudokuSolution):
     '''
-    Creates a valid puzzle based on the solution generated by the SudokuSolution class. 
+    Creates a valid puzzle based on the solution generated by the SudokuSolution class. The strategy parameter selects how the solution is built and the rng parameter where its randomness comes from (see SudokuSolution).
 
     Attributes
     ----------
@@ -259,10 +826,28 @@ class SudokuPuzzle(SudokuSolution):
         The final 9x9 matrix-form of the Sudoku puzzle (i.e., the solution matrix with hidden values).
 
     puzzle_boxes : dict
-        The final dictionary-form of the Sudoku puzzle (i.e., contains hidden values).
+        The final dictionary-form of the Sudoku puzzle (i.e., contains hidden values). The boxes are views of the puzzle attribute.
+
+    solver : type
+        An optional solver class (e.g., DancingLinksSolver) used by solve_puzzle() in place of its own algorithm. The class is constructed with the 9x9 matrix and its solve() method must return the solution or None. Defaults to None.
+
+    clues : int
+        The number of clues to carve the puzzle down to with carve_puzzle(), or None (the default) to hide 3 instances of each number.
+
+    symmetry : str
+        The symmetry of the clue layout, one of SYMMETRIES. A symmetric layout is always carved with carve_puzzle(), to DEFAULT_CLUES clues if the clues attribute is None. Defaults to 'none'.
+
+    grade : Grade
+        The Grade of the puzzle, set by grade_puzzle(). Defaults to None.
+
+    solve_budget : int
+        The maximum number of solve_puzzle() iterations that check_puzzle_solution() spends before falling back to count_solutions().
 
     Methods
     -------
+    from_puzzle(puzzle, solution=None):
+        Creates a SudokuPuzzle from an existing puzzle matrix (hidden values negated) instead of generating a new one.
+
     other_indices_in_box(idx): 
         Takes the given index and returns a list of indices (integers) that are also within that box. For example, if 7 is the given index (either row or column), the other indicies in that box are 6 and 8. 
     
@@ -275,25 +860,72 @@ class SudokuPuzzle(SudokuSolution):
     hide_num_across_board(num):
         Applies a simple algorithm to hide 3 instances of the given num across the matrix.
     
+    carve_puzzle(target_clues, symmetry='none'):
+        Hides clues one orbit at a time in random order, keeping each removal only while the puzzle has a unique solution, until target_clues clues are left.
+
     create_puzzle():
-        Iterates through each possible number (1-9) and runs the hide_num_across_board() method on each number. Assigns the final solution to the puzzle attribute (i.e., the 9x9 matrix-form of the Sudoku puzzle) and the box attribute (i.e., the dictionary-form of the Sudoku puzzle).
+        Iterates through each possible number (1-9) and runs the hide_num_across_board() method on each number, or runs carve_puzzle() if the clues attribute is set or the layout is symmetric. Assigns a copy of the final matrix to the puzzle attribute (i.e., the 9x9 matrix-form of the Sudoku puzzle), which the puzzle_boxes attribute (i.e., the dictionary-form of the Sudoku puzzle) is a view of.
 
-    solve_puzzle():
-        Applies a simple algorithm to solve the created puzzle.
+    solve_puzzle(max_iterations=None):
+        Applies a simple algorithm to solve the created puzzle. The options for each hidden cell are looked up in a CandidateMasks object that is updated as cells are filled in. Returns a SolveResult saying whether the puzzle was solved, got stuck or hit a contradiction.
 
     check_puzzle_solution():
-        Regenerates a Sudoku puzzle until the solve_puzzle solution matches the solution generated by the SudokuSolution class.
+        Regenerates the Sudoku puzzle until it has exactly one solution, trying a bounded solve_puzzle() before count_solutions().
+
+    grade_puzzle():
+        Grades the puzzle with a LogicalSolver, stores its Grade (rating, difficulty band and technique counts) in the grade attribute and returns it.
     '''
-    def __init__(self):
-        super().__init__()
-        self.solution = deepcopy(self.matrix)
+    solve_budget = 20
+
+    def __init__(self, solver: type = None, strategy: str = 'placement', clues: int = None, symmetry: str = 'none', rng: np.random.Generator | int = None):
+        super().__init__(strategy=strategy, rng=rng)
+        self.solver = solver
+        self.clues = clues
+        self.symmetry = symmetry
+        self.solution = self.matrix.copy()
         self.puzzle = None
-        self.puzzle_boxes = None
+        self.grade = None
 
         self.create_puzzle()
-        self.solve_puzzle()
         self.check_puzzle_solution()
 
+    @classmethod
+    def from_puzzle(cls, puzzle: np.array, solution: np.array = None) -> 'SudokuPuzzle':
+        '''
+        Creates a SudokuPuzzle from an existing puzzle matrix instead of generating a new one. As in the puzzle attribute, the hidden values must be negated, so the solution is the absolute value of the matrix unless a stored one is given. Nothing is solved.
+
+        Parameters
+        ----------
+        puzzle : np.array
+            A 9x9 puzzle matrix with the hidden values negated.
+
+        solution : np.array, optional
+            The 9x9 solution of the puzzle, e.g., as stored alongside it. Defaults to None (the absolute value of the puzzle).
+
+        Return
+        ------
+        A SudokuPuzzle whose puzzle and solution attributes are taken from the matrix.
+        '''
+        sudoku_puzzle = cls.__new__(cls)
+        sudoku_puzzle.strategy = None
+        sudoku_puzzle.rng = RandomStream()
+        sudoku_puzzle.grid = (np.abs(np.asarray(puzzle, dtype=int)) if solution is None else np.array(solution, dtype=int)).ravel()
+        sudoku_puzzle.assignments = {}
+        sudoku_puzzle.solver = None
+        sudoku_puzzle.clues = int((np.asarray(puzzle) > 0).sum())
+        sudoku_puzzle.symmetry = 'none'
+        sudoku_puzzle.solution = sudoku_puzzle.matrix.copy()
+        sudoku_puzzle.puzzle = np.array(puzzle, dtype=int)
+        sudoku_puzzle.grade = None
+        return sudoku_puzzle
+
+    @property
+    def puzzle_boxes(self) -> dict:
+        '''A dictionary of 3x3 views of the puzzle attribute, keyed by box number (1-9).'''
+        if self.puzzle is None:
+            return None
+        return matrix_boxes(self.puzzle)
+
     def other_indices_in_box(self, idx: int) -> list[int, int, int]:
         '''
         Takes the given index and returns a list of indices (integers) that are also within that box. For example, if 7 is the given index (either row or column), the other indicies in that box are 6 and 8. 
@@ -333,8 +965,7 @@ class SudokuPuzzle(SudokuSolution):
         ------
         None
         '''
-        self.matrix[row_idx, col_idx] = -1 * num 
-        self.unstack()
+        self.grid[row_idx*9 + col_idx] = -1 * num 
 
     def unhide_nums(self, num: int) -> None:
         '''
@@ -350,8 +981,7 @@ class SudokuPuzzle(SudokuSolution):
         ------
         None
         '''
-        self.matrix[self.matrix==-1*num] = num 
-        self.unstack()
+        self.grid[self.grid==-1*num] = num 
 
     def hide_num_across_board(self, num):
         '''
@@ -372,7 +1002,7 @@ class SudokuPuzzle(SudokuSolution):
         while len(hidden_coordinates) < 3:
             row_indices = num_coordinates[:,0]
             col_indices = num_coordinates[:,1]  
-            row_idx, col_idx = random.choice(num_coordinates)
+            row_idx, col_idx = self.rng.choice(num_coordinates)
             hidden_coordinates.append((row_idx, col_idx))
 
             self.hide_num(row_idx, col_idx, num)
@@ -383,66 +1013,125 @@ class SudokuPuzzle(SudokuSolution):
             )
             num_coordinates = np.delete(num_coordinates, coordinates_to_drop, axis=0)
 
-    def create_puzzle(self):
+    def create_puzzle(self, symmetry: str = None):
         '''
-        Iterates through each possible number (1-9) and runs the hide_num_across_board() method on each number. Assigns the final solution to the puzzle attribute (i.e., the 9x9 matrix-form of the Sudoku puzzle) and the box attribute (i.e., the dictionary-form of the Sudoku puzzle).
+        Iterates through each possible number (1-9) and runs the hide_num_across_board() method on each number. Assigns a copy of the final matrix to the puzzle attribute (i.e., the 9x9 matrix-form of the Sudoku puzzle), which the puzzle_boxes attribute (i.e., the dictionary-form of the Sudoku puzzle) is a view of.
+
+        If the clues attribute is set, or the clue layout is symmetric, the clues are removed with carve_puzzle() instead: one symmetric orbit of cells at a time, with one uniqueness check per orbit.
 
         Parameters
         ----------
-        None
+        symmetry : str, optional
+            The symmetry of the clue layout, one of SYMMETRIES. Defaults to None (the symmetry attribute).
 
         Return
         ------
         None
         '''
-        for num in range(1,10):
-            self.hide_num_across_board(num)
-        self.puzzle = deepcopy(self.matrix)
+        if symmetry is not None:
+            self.symmetry = symmetry
 
-        self.unstack()
-        self.puzzle_boxes = deepcopy(self.boxes)
+        if self.clues is not None or self.symmetry != 'none':
+            target_clues = DEFAULT_CLUES if self.clues is None else self.clues
+            self.carve_puzzle(target_clues, symmetry=self.symmetry)
+        else:
+            for num in range(1,10):
+                self.hide_num_across_board(num)
+        self.puzzle = self.matrix.copy()
 
-    def solve_puzzle(self):
+    def carve_puzzle(self, target_clues: int, symmetry: str = 'none') -> int:
         '''
-        Applies a simple algorithm to solve the created puzzle.
+        Hides clues one orbit at a time (see clue_orbits()) in random order, keeping a removal only if the puzzle still has exactly one solution according to a SolutionCounter. Carving stops once the puzzle is down to target_clues clues, or when every orbit has been tried. In that case the puzzle is minimal for this order and has more clues than the target.
 
         Parameters
         ----------
-        None
+        target_clues : int
+            The number of clues to carve the puzzle down to. Range: [17,81].
+
+        symmetry : str, optional
+            The symmetry of the clue layout, one of SYMMETRIES (see clue_orbits()). Defaults to 'none'.
 
         Return
         ------
-        None
+        The number of clues (int) left in the puzzle.
         '''
-        hidden_values = np.argwhere(self.matrix<0)
-        while hidden_values.size>1:
-            for row_idx, col_idx in hidden_values:
-                row = self.matrix[row_idx,:]
-                col = self.matrix[:,col_idx]
+        orbits = clue_orbits(symmetry)
+        self.rng.shuffle(orbits)
+
+        counter = SolutionCounter(self.solution)
+        clues = 81 - len(counter.hidden_values)
+        for orbit in orbits:
+            if clues <= target_clues:
+                break
+            if clues - len(orbit) < target_clues:
+                continue
+
+            counter.remove(orbit)
+            if counter.count(limit=2) == 1:
+                clues -= len(orbit)
+            else:
+                counter.restore(orbit)
+
+        self.matrix = self.solution
+        for row_idx, col_idx in counter.hidden_values:
+            self.hide_num(row_idx, col_idx, int(self.solution[row_idx, col_idx]))
+        return clues
+
+    def solve_puzzle(self, max_iterations: int = None) -> SolveResult:
+        '''
+        Applies a simple algorithm to solve the created puzzle. Each iteration sweeps over the hidden cells and fills in any cell with exactly one option left in its row, column and box (looked up in a CandidateMasks object). The sweeps stop when no hidden cells remain, when a sweep fills in nothing (the puzzle needs more than this algorithm), when a hidden cell has no options (the board is invalid) or when max_iterations sweeps have been made.
 
-                # box indicies
-                box_row = self.other_indices_in_box(row_idx)
-                box_row_min = min(box_row)
-                box_row_max = max(box_row) + 1
+        If the solver attribute is set, the puzzle is solved with that class instead in a single iteration, and the matrix is left unchanged when it finds no solution ('contradiction') or several ('stuck').
+
+        Parameters
+        ----------
+        max_iterations : int, optional
+            The maximum number of sweeps over the hidden cells. Defaults to None (no limit).
 
-                box_col = self.other_indices_in_box(col_idx)
-                box_col_min = min(box_col)
-                box_col_max = max(box_col) + 1
+        Return
+        ------
+        A SolveResult with the status and the number of iterations made.
+        '''
+        if self.solver is not None:
+            solver = self.solver(self.matrix)
+            solution = solver.solve()
+            if solution is not None:
+                self.matrix = solution
+                return SolveResult('solved', 1)
+            return SolveResult('contradiction' if getattr(solver, 'status', None) == 'no solution' else 'stuck', 1)
+
+        masks = CandidateMasks(self.matrix)
+        hidden_values = [(row_idx, col_idx) for row_idx, col_idx in np.argwhere(self.matrix<0)]
+        iterations = 0
+        while len(hidden_values)>0:
+            if max_iterations is not None and iterations >= max_iterations:
+                return SolveResult('out of budget', iterations)
+            iterations+=1
+
+            still_hidden = []
+            for row_idx, col_idx in hidden_values:
+                num_options = masks.candidates(row_idx, col_idx)
 
-                box = self.matrix[box_row_min:box_row_max, box_col_min:box_col_max]
+                if not num_options:
+                    return SolveResult('contradiction', iterations)
 
-                # num to exclude for list of options (range(1,10))
-                num_to_exclude = np.hstack([row[row>0],col[col>0], box[box>0]])
-                num_options = np.setdiff1d(np.arange(1,10), num_to_exclude)
+                # a single option is a power of two
+                if not (num_options & (num_options-1)):
+                    num = num_options.bit_length()
+                    self.grid[row_idx*9 + col_idx] = num
+                    masks.place(row_idx, col_idx, num)
+                else:
+                    still_hidden.append((row_idx, col_idx))
 
-                if (num_options.size<2):
-                    self.matrix[row_idx, col_idx] = num_options[0]
+            if len(still_hidden) == len(hidden_values):
+                return SolveResult('stuck', iterations)
+            hidden_values = still_hidden
 
-            hidden_values = np.argwhere(self.matrix<0)
+        return SolveResult('solved', iterations)
 
-    def check_puzzle_solution(self) -> str:
+    def check_puzzle_solution(self) -> None:
         '''
-        Regenerates a Sudoku puzzle until the solve_puzzle solution matches the solution generated by the SudokuSolution class.
+        Regenerates the Sudoku puzzle until it has exactly one solution. A puzzle that solve_puzzle() solves within solve_budget iterations is unique, as every value it fills in is forced. Otherwise the solutions are counted with count_solutions(), which stops as soon as a second solution is found. The accepted puzzle's solution is the one generated by the SudokuSolution class, which is assigned back to the matrix attribute.
 
         Parameters
         ----------
@@ -452,6 +1141,1846 @@ class SudokuPuzzle(SudokuSolution):
         ------
         None
         '''
-        while not np.array_equal(self.matrix, self.solution):
-                self.create_puzzle()
-                self.solve_puzzle()
+        while True:
+            result = self.solve_puzzle(max_iterations=self.solve_budget)
+            if result.status == 'solved' or count_solutions(self.puzzle, limit=2) == 1:
+                break
+            self.matrix = self.solution
+            self.create_puzzle()
+        self.matrix = self.solution
+
+    def grade_puzzle(self) -> 'Grade':
+        '''
+        Grades the puzzle with a LogicalSolver, i.e., by the human solving techniques it needs, and stores the result in the grade attribute.
+
+        Parameters
+        ----------
+        None
+
+        Return
+        ------
+        A Grade with the rating, difficulty band and technique counts of the puzzle.
+        '''
+        self.grade = LogicalSolver(self.puzzle).grade()
+        return self.grade
+
+class DancingLinksSolver:
+    '''
+    Solves a Sudoku puzzle by treating it as an exact cover problem and applying Knuth's Algorithm X with dancing links. Unlike the solve_puzzle() method of the SudokuPuzzle class, the search backtracks, so it can solve puzzles that need guessing and can tell whether a puzzle has no solution or several.
+
+    The exact cover matrix has 324 columns (one per cell, one per number in each row, one per number in each column and one per number in each box) and 729 rows (one per number in each cell). The links are stored in flat lists of integers rather than node objects.
+
+    Attributes
+    ----------
+    matrix : np.array
+        The 9x9 puzzle being solved. Negative or zero values are unknown.
+
+    solutions : list
+        A list of the 9x9 solutions (np.array) found by the last call to solve().
+
+    status : str
+        The outcome of the last call to solve(). One of 'unsolved' (solve() has not been called), 'solved' (exactly one solution), 'no solution' or 'multiple solutions'.
+
+    solution : np.array
+        The unique solution of the puzzle, or None if the puzzle has no solution or several.
+
+    Methods
+    -------
+    build_links():
+        Creates the dancing links of the full exact cover matrix.
+
+    cover(col):
+        Removes the given column, and every row that has a node in it, from the links.
+
+    uncover(col):
+        Restores the given column and its rows, undoing cover(col).
+
+    select_givens():
+        Covers the columns satisfied by the visible values of the puzzle.
+
+    search(partial, limit):
+        Recursively searches for solutions, stopping once the number of solutions found reaches the limit.
+
+    solve(limit=2):
+        Searches for up to limit solutions and returns the solution if the puzzle has exactly one.
+    '''
+    # the link lists of the full exact cover matrix are built once and copied for each solver
+    _template = None
+
+    n_cols = 324
+
+    def __init__(self, matrix: np.array) -> None:
+        self.matrix = np.asarray(matrix)
+        self.solutions = []
+        self.status = 'unsolved'
+        self.solution = None
+
+    @staticmethod
+    def candidate_columns(row_idx: int, col_idx: int, num: int) -> tuple[int, int, int, int]:
+        '''
+        Returns the four exact cover columns satisfied by placing num at coordinates row_idx, col_idx. The columns are numbered from 1, as column 0 is the root of the links.
+
+        Parameters
+        ----------
+        row_idx : int
+            A row index of the matrix. Range: [0,9).
+
+        col_idx : int
+            A column index of the matrix. Range: [0,9).
+
+        num : int
+            The number placed in the cell. Range: [1,9].
+
+        Return
+        ------
+        A tuple of 4 column numbers (int): the cell, row-number, column-number and box-number constraints.
+        '''
+        box_idx = (row_idx // 3) * 3 + col_idx // 3
+        return (
+            1 + row_idx * 9 + col_idx,
+            82 + row_idx * 9 + num - 1,
+            163 + col_idx * 9 + num - 1,
+            244 + box_idx * 9 + num - 1,
+        )
+
+    def build_links(self) -> None:
+        '''
+        Creates the dancing links of the full exact cover matrix. Node 0 is the root, nodes 1-324 are the column headers and every candidate (row_idx, col_idx, num) owns the 4 consecutive nodes starting at 325 + 4*candidate, where candidate = (row_idx*9 + col_idx)*9 + num - 1.
+
+        Return
+        ------
+        None
+        '''
+        cls = type(self)
+        if cls._template is None:
+            n_cols = cls.n_cols
+            size = 1 + n_cols + 729 * 4
+            left = [i - 1 for i in range(size)]
+            right = [i + 1 for i in range(size)]
+            up = list(range(size))
+            down = list(range(size))
+            column = list(range(size))
+            sizes = [0] * (n_cols + 1)
+
+            # circular list of the column headers
+            left[0] = n_cols
+            right[n_cols] = 0
+
+            node = n_cols + 1
+            for row_idx in range(9):
+                for col_idx in range(9):
+                    for num in range(1, 10):
+                        first = node
+                        for col in cls.candidate_columns(row_idx, col_idx, num):
+                            # append the node to the bottom of the column
+                            up[node] = up[col]
+                            down[node] = col
+                            down[up[col]] = node
+                            up[col] = node
+                            column[node] = col
+                            sizes[col] += 1
+                            node += 1
+                        left[first] = node - 1
+                        right[node - 1] = first
+            cls._template = (left, right, up, down, column, sizes)
+
+        left, right, up, down, column, sizes = cls._template
+        self.left = left[:]
+        self.right = right[:]
+        self.up = up[:]
+        self.down = down[:]
+        self.column = column
+        self.sizes = sizes[:]
+
+    def cover(self, col: int) -> None:
+        '''
+        Removes the given column, and every row that has a node in it, from the links.
+
+        Parameters
+        ----------
+        col : int
+            The column header to cover. Range: [1,324].
+
+        Return
+        ------
+        None
+        '''
+        left, right, up, down, column, sizes = self.left, self.right, self.up, self.down, self.column, self.sizes
+        left[right[col]] = left[col]
+        right[left[col]] = right[col]
+        i = down[col]
+        while i != col:
+            j = right[i]
+            while j != i:
+                up[down[j]] = up[j]
+                down[up[j]] = down[j]
+                sizes[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, col: int) -> None:
+        '''
+        Restores the given column and its rows, undoing cover(col).
+
+        Parameters
+        ----------
+        col : int
+            The column header to uncover. Range: [1,324].
+
+        Return
+        ------
+        None
+        '''
+        left, right, up, down, column, sizes = self.left, self.right, self.up, self.down, self.column, self.sizes
+        i = up[col]
+        while i != col:
+            j = left[i]
+            while j != i:
+                sizes[column[j]] += 1
+                up[down[j]] = j
+                down[up[j]] = j
+                j = left[j]
+            i = up[i]
+        left[right[col]] = col
+        right[left[col]] = col
+
+    def select_givens(self) -> bool:
+        '''
+        Covers the columns satisfied by the visible (positive) values of the puzzle.
+
+        Return
+        ------
+        A boolean value. False if two visible values conflict (i.e., the puzzle has no solution) and True otherwise.
+        '''
+        covered = set()
+        for row_idx, col_idx in np.argwhere(self.matrix > 0):
+            num = int(self.matrix[row_idx, col_idx])
+            cols = self.candidate_columns(row_idx, col_idx, num)
+            if covered.intersection(cols):
+                return False
+            covered.update(cols)
+            for col in cols:
+                self.cover(col)
+        return True
+
+    def search(self, partial: list, limit: int) -> bool:
+        '''
+        Recursively searches for solutions, always branching on the column with the fewest remaining rows. Each complete cover is converted to a 9x9 matrix and appended to the solutions attribute.
+
+        Parameters
+        ----------
+        partial : list
+            The candidates selected so far by the search.
+
+        limit : int
+            The number of solutions after which the search stops.
+
+        Return
+        ------
+        A boolean value. True if the limit has been reached and False otherwise.
+        '''
+        right, down, column, sizes = self.right, self.down, self.column, self.sizes
+        if right[0] == 0:
+            self.solutions.append(self.to_matrix(partial))
+            return len(self.solutions) >= limit
+
+        # column with the fewest rows
+        col = right[0]
+        best = col
+        while col != 0:
+            if sizes[col] < sizes[best]:
+                best = col
+                if sizes[best] < 2:
+                    break
+            col = right[col]
+        if sizes[best] == 0:
+            return False
+
+        self.cover(best)
+        done = False
+        node = down[best]
+        while node != best and not done:
+            partial.append((node - self.n_cols - 1) // 4)
+            j = right[node]
+            while j != node:
+                self.cover(column[j])
+                j = right[j]
+
+            done = self.search(partial, limit)
+
+            j = self.left[node]
+            while j != node:
+                self.uncover(column[j])
+                j = self.left[j]
+            partial.pop()
+            node = down[node]
+        self.uncover(best)
+        return done
+
+    def to_matrix(self, partial: list) -> np.array:
+        '''
+        Combines the visible values of the puzzle with the selected candidates into a 9x9 matrix.
+
+        Parameters
+        ----------
+        partial : list
+            The selected candidates. A candidate is (row_idx*9 + col_idx)*9 + num - 1.
+
+        Return
+        ------
+        A 9x9 np.array.
+        '''
+        solution = np.where(self.matrix > 0, self.matrix, 0)
+        for candidate in partial:
+            cell, num = divmod(candidate, 9)
+            solution[cell // 9, cell % 9] = num + 1
+        return solution
+
+    def solve(self, limit: int = 2) -> np.array:
+        '''
+        Searches for up to limit solutions and records the outcome in the status attribute. A limit of 2 is enough to tell a unique solution apart from several.
+
+        Parameters
+        ----------
+        limit : int, optional
+            The number of solutions after which the search stops. With a limit of 1 the status is 'solved' as soon as any solution is found.
+
+        Return
+        ------
+        The unique solution (np.array) of the puzzle, or None if it has no solution or several.
+        '''
+        self.build_links()
+        self.solutions = []
+        if self.select_givens():
+            self.search([], limit)
+
+        if len(self.solutions) == 0:
+            self.status = 'no solution'
+        elif len(self.solutions) == 1:
+            self.status = 'solved'
+        else:
+            self.status = 'multiple solutions'
+
+        self.solution = self.solutions[0] if self.status == 'solved' else None
+        return self.solution
+
+# cell indices (row_idx*9 + col_idx) of each row, column and box, and of the 20 peers of each cell
+ROW_CELLS = [[row_idx*9 + col_idx for col_idx in range(9)] for row_idx in range(9)]
+COL_CELLS = [[row_idx*9 + col_idx for row_idx in range(9)] for col_idx in range(9)]
+BOX_CELLS = [[(box_row*3 + i)*9 + box_col*3 + j for i in range(3) for j in range(3)] for box_row in range(3) for box_col in range(3)]
+UNITS = ROW_CELLS + COL_CELLS + BOX_CELLS
+PEERS = [sorted({peer for unit in UNITS if cell in unit for peer in unit} - {cell}) for cell in range(81)]
+PEER_SETS = [set(peers) for peers in PEERS]
+
+# UNIT_OTHERS[u][pos] holds the cells of UNITS[u] other than its pos-th cell
+UNIT_OTHERS = [[tuple(other for other in unit if other != cell) for cell in unit] for unit in UNITS]
+
+# UNIT_GETTERS[u] picks the entries of the cells of UNITS[u] out of a list of 81, in one call
+UNIT_GETTERS = [itemgetter(*unit) for unit in UNITS]
+
+# POSITION_BITS[pos][mask] sets bit 9*(num-1) + pos for each num in a candidate mask, so summing it over the cells of a unit gives a 9-bit mask of the positions of each number (see LogicalSolver.positions())
+POSITION_BITS = [[sum(1 << (9*(num - 1) + pos) for num in range(1, 10) if mask & (1 << (num - 1))) for mask in range(ALL_CANDIDATES + 1)] for pos in range(9)]
+
+# each row or column segment of a box as (segment, rest of the line, rest of the box)
+INTERSECTIONS = [
+    (segment, [cell for cell in line if cell not in segment], [cell for cell in box if cell not in segment])
+    for line in ROW_CELLS + COL_CELLS
+    for box in BOX_CELLS
+    for segment in [[cell for cell in line if cell in box]]
+    if segment
+]
+
+# techniques in the order LogicalSolver tries them, with the rating of each
+TECHNIQUE_RATINGS = {
+    'hidden single': 1.5,
+    'naked single': 2.3,
+    'pointing': 2.6,
+    'box-line reduction': 2.8,
+    'naked pair': 3.0,
+    'x-wing': 3.2,
+    'hidden pair': 3.4,
+    'naked triple': 3.6,
+    'swordfish': 3.8,
+    'hidden triple': 4.0,
+    'xy-wing': 4.2,
+}
+
+# the rating of a puzzle that the techniques above cannot solve
+UNSOLVED_RATING = 5.0
+
+# the highest rating in each difficulty band
+DIFFICULTY_BANDS = {
+    'easy': 2.3,
+    'medium': 2.8,
+    'hard': 3.4,
+    'expert': 4.2,
+    'diabolical': UNSOLVED_RATING,
+}
+
+def difficulty_band(rating: float) -> str:
+    '''
+    Takes a rating produced by LogicalSolver and returns its difficulty band (a key of DIFFICULTY_BANDS).
+
+    Parameters
+    ----------
+    rating : float
+        A puzzle rating. Range: [0, UNSOLVED_RATING].
+
+    Return
+    ------
+    The name (str) of the difficulty band.
+    '''
+    for band, max_rating in DIFFICULTY_BANDS.items():
+        if rating <= max_rating:
+            return band
+    return 'diabolical'
+
+class Step(NamedTuple):
+    '''
+    A single logical deduction found by LogicalSolver. Cells are indexed row by row, i.e., cell (row_idx, col_idx) is row_idx*9 + col_idx.
+
+    Attributes
+    ----------
+    technique : str
+        The name of the technique (a key of TECHNIQUE_RATINGS).
+
+    placements : tuple
+        The (cell, num) pairs the deduction fills in.
+
+    eliminations : tuple
+        The (cell, num) pairs the deduction removes from the candidates.
+
+    cells : tuple
+        The cells that justify the deduction (e.g., the two cells of a naked pair).
+    '''
+    technique: str
+    placements: tuple
+    eliminations: tuple
+    cells: tuple
+
+class Grade(NamedTuple):
+    '''
+    The difficulty of a puzzle as measured by LogicalSolver.grade().
+
+    Attributes
+    ----------
+    rating : float
+        The rating of the hardest technique that was needed, or UNSOLVED_RATING if the techniques could not solve the puzzle.
+
+    band : str
+        The difficulty band of the rating (a key of DIFFICULTY_BANDS).
+
+    counts : dict
+        The number of times each technique was applied, keyed by technique name.
+
+    solved : bool
+        True if the techniques solved the puzzle and False otherwise.
+    '''
+    rating: float
+    band: str
+    counts: dict
+    solved: bool
+
+class LogicalSolver:
+    '''
+    Solves a Sudoku puzzle the way a person would, by applying the techniques in TECHNIQUE_RATINGS in escalating order of difficulty: hidden and naked singles, pointing, box-line reduction, naked and hidden pairs and triples, X-Wing, Swordfish and XY-Wing. After every deduction the solver starts again from the easiest technique, so each technique is only used when the easier ones are stuck. The techniques that were needed, and how many times, give the puzzle's rating and difficulty band.
+
+    Cells are indexed row by row, i.e., cell (row_idx, col_idx) is row_idx*9 + col_idx, and candidates are 9-bit masks as in CandidateMasks.
+
+    Attributes
+    ----------
+    values : list
+        The 81 cell values. Zero means the cell is not filled in yet.
+
+    candidates : list
+        The 81 candidate masks. Filled in cells have no candidates.
+
+    counts : dict
+        The number of times each technique has been applied, keyed by technique name.
+
+    status : str
+        One of 'unsolved', 'solved', 'stuck' (no technique applies) or 'contradiction' (the board is invalid).
+
+    Methods
+    -------
+    place(cell, num):
+        Fills num into the cell and removes it from the candidates of the cell's peers.
+
+    apply(step):
+        Applies the placements and eliminations of a Step and counts its technique.
+
+    find_steps():
+        Returns the deductions of the easiest technique that applies to the current board.
+
+    solve():
+        Applies deductions until the puzzle is solved or no technique applies.
+
+    grade():
+        Solves the puzzle and returns its Grade.
+    '''
+    def __init__(self, matrix: np.array) -> None:
+        self.values = [0] * 81
+        self.candidates = [ALL_CANDIDATES] * 81
+        self.counts = {}
+        self.status = 'unsolved'
+        self.remaining = 81
+
+        # only the positive (i.e., visible) values are known
+        for cell, num in enumerate(np.asarray(matrix).ravel().tolist()):
+            if num > 0:
+                if not self.candidates[cell] & (1 << (num - 1)):
+                    self.status = 'contradiction'
+                self.place(cell, num)
+
+        self.finders = (
+            ('hidden single', self.hidden_singles),
+            ('naked single', self.naked_singles),
+            ('pointing', lambda: self.intersections('pointing')),
+            ('box-line reduction', lambda: self.intersections('box-line reduction')),
+            ('naked pair', lambda: self.naked_subsets(2)),
+            ('x-wing', lambda: self.fish(2)),
+            ('hidden pair', lambda: self.hidden_subsets(2)),
+            ('naked triple', lambda: self.naked_subsets(3)),
+            ('swordfish', lambda: self.fish(3)),
+            ('hidden triple', lambda: self.hidden_subsets(3)),
+            ('xy-wing', self.xy_wings),
+        )
+
+    def place(self, cell: int, num: int) -> None:
+        '''
+        Fills num into the cell and removes it from the candidates of the cell's peers.
+
+        Parameters
+        ----------
+        cell : int
+            The cell index. Range: [0,81).
+
+        num : int
+            The number placed in the cell. Range: [1,9].
+
+        Return
+        ------
+        None
+        '''
+        candidates = self.candidates
+        keep = ~(1 << (num - 1))
+        self.values[cell] = num
+        candidates[cell] = 0
+        self.remaining -= 1
+        for peer in PEERS[cell]:
+            candidates[peer] &= keep
+
+    def apply(self, step: Step) -> None:
+        '''
+        Applies the placements and eliminations of a Step and counts its technique. A step that changes nothing (e.g., a hidden single already found through another unit of the same batch) is not counted. If a placement is no longer possible, the status becomes 'contradiction'.
+
+        Parameters
+        ----------
+        step : Step
+            The deduction to apply.
+
+        Return
+        ------
+        None
+        '''
+        changed = False
+        for cell, num in step.placements:
+            if self.values[cell] == num:
+                continue
+            if not self.candidates[cell] & (1 << (num - 1)):
+                self.status = 'contradiction'
+                return
+            self.place(cell, num)
+            changed = True
+        for cell, num in step.eliminations:
+            bit = 1 << (num - 1)
+            if self.candidates[cell] & bit:
+                self.candidates[cell] &= ~bit
+                changed = True
+        if changed:
+            self.counts[step.technique] = self.counts.get(step.technique, 0) + 1
+
+    def positions(self, unit_idx: int) -> int:
+        '''
+        Returns where each number can go in a row, column or box, for all nine numbers at once (see POSITION_BITS).
+
+        Parameters
+        ----------
+        unit_idx : int
+            The index of the unit in UNITS. Range: [0,27).
+
+        Return
+        ------
+        An int holding one 9-bit mask per number: bit 9*(num-1) + pos is set if num is a candidate of the pos-th cell of the unit.
+        '''
+        return sum(map(getitem, POSITION_BITS, UNIT_GETTERS[unit_idx](self.candidates)))
+
+    def hidden_singles(self) -> list[Step]:
+        '''
+        Finds every number that has only one possible cell left in a row, column or box.
+
+        Return
+        ------
+        A list of Steps, one per placement.
+        '''
+        candidates, values = self.candidates, self.values
+        steps = []
+        for unit, others in zip(UNITS, UNIT_OTHERS):
+            once = twice = placed = 0
+            for cell in unit:
+                mask = candidates[cell]
+                twice |= once & mask
+                once |= mask
+                if values[cell]:
+                    placed |= 1 << (values[cell] - 1)
+            if (once | placed) != ALL_CANDIDATES:
+                # a number has nowhere to go
+                self.status = 'contradiction'
+                return []
+            singles = once & ~twice
+            while singles:
+                bit = singles & -singles
+                singles ^= bit
+                for pos, cell in enumerate(unit):
+                    if candidates[cell] & bit:
+                        steps.append(Step('hidden single', ((cell, bit.bit_length()),), (), others[pos]))
+                        break
+        return steps
+
+    def naked_singles(self) -> list[Step]:
+        '''
+        Finds every cell that has only one candidate left.
+
+        Return
+        ------
+        A list of Steps, one per placement.
+        '''
+        candidates, values = self.candidates, self.values
+        steps = []
+        for cell in range(81):
+            mask = candidates[cell]
+            if not values[cell] and not mask:
+                self.status = 'contradiction'
+                return []
+            if mask and not (mask & (mask - 1)):
+                steps.append(Step('naked single', ((cell, mask.bit_length()),), (), tuple(peer for peer in PEERS[cell] if values[peer])))
+        return steps
+
+    def intersections(self, technique: str) -> list[Step]:
+        '''
+        Finds a number whose candidates in a box all lie in one row or column (pointing), so it can be removed from the rest of that line, or whose candidates in a row or column all lie in one box (box-line reduction), so it can be removed from the rest of that box.
+
+        Parameters
+        ----------
+        technique : str
+            'pointing' or 'box-line reduction'.
+
+        Return
+        ------
+        A list with one Step, or an empty list.
+        '''
+        candidates = self.candidates
+        for segment, line_rest, box_rest in INTERSECTIONS:
+            segment_mask = 0
+            for cell in segment:
+                segment_mask |= candidates[cell]
+            if not segment_mask:
+                continue
+            line_mask = box_mask = 0
+            for cell in line_rest:
+                line_mask |= candidates[cell]
+            for cell in box_rest:
+                box_mask |= candidates[cell]
+
+            if technique == 'pointing':
+                digits, targets = segment_mask & ~box_mask & line_mask, line_rest
+            else:
+                digits, targets = segment_mask & ~line_mask & box_mask, box_rest
+            if digits:
+                eliminations = tuple((cell, num) for cell in targets for num in CandidateMasks.options(candidates[cell] & digits))
+                justification = tuple(cell for cell in segment if candidates[cell] & digits)
+                return [Step(technique, (), eliminations, justification)]
+        return []
+
+    def naked_subsets(self, size: int) -> list[Step]:
+        '''
+        Finds size cells of a row, column or box whose candidates together contain exactly size numbers, so those numbers can be removed from the other cells of the unit.
+
+        Parameters
+        ----------
+        size : int
+            2 for naked pairs or 3 for naked triples.
+
+        Return
+        ------
+        A list with one Step, or an empty list.
+        '''
+        candidates = self.candidates
+        technique = 'naked pair' if size == 2 else 'naked triple'
+        for unit in UNITS:
+            open_cells = [cell for cell in unit if candidates[cell]]
+            if len(open_cells) <= size:
+                continue
+            pool = [cell for cell in open_cells if candidates[cell].bit_count() <= size]
+            for subset in combinations(pool, size):
+                union = 0
+                for cell in subset:
+                    union |= candidates[cell]
+                if union.bit_count() != size:
+                    continue
+                eliminations = tuple(
+                    (cell, num)
+                    for cell in open_cells if cell not in subset
+                    for num in CandidateMasks.options(candidates[cell] & union)
+                )
+                if eliminations:
+                    return [Step(technique, (), eliminations, subset)]
+        return []
+
+    def hidden_subsets(self, size: int) -> list[Step]:
+        '''
+        Finds size numbers that are confined to the same size cells of a row, column or box, so every other candidate can be removed from those cells.
+
+        Parameters
+        ----------
+        size : int
+            2 for hidden pairs or 3 for hidden triples.
+
+        Return
+        ------
+        A list with one Step, or an empty list.
+        '''
+        candidates = self.candidates
+        technique = 'hidden pair' if size == 2 else 'hidden triple'
+        for unit_idx, unit in enumerate(UNITS):
+            packed = self.positions(unit_idx)
+            # positions[num] is a 9-bit mask of the unit cells that can hold num
+            positions = {}
+            for num in range(1, 10):
+                mask = packed >> 9*(num - 1) & ALL_CANDIDATES
+                if 2 <= mask.bit_count() <= size:
+                    positions[num] = mask
+            if len(positions) < size:
+                continue
+            for nums in combinations(positions, size):
+                union = 0
+                for num in nums:
+                    union |= positions[num]
+                if union.bit_count() != size:
+                    continue
+                keep = 0
+                for num in nums:
+                    keep |= 1 << (num - 1)
+                cells = tuple(unit[idx] for idx in range(9) if union & (1 << idx))
+                eliminations = tuple((cell, num) for cell in cells for num in CandidateMasks.options(candidates[cell] & ~keep))
+                if eliminations:
+                    return [Step(technique, (), eliminations, cells)]
+        return []
+
+    def fish(self, size: int) -> list[Step]:
+        '''
+        Finds a number whose candidates in size rows lie in the same size columns (or vice versa), so it can be removed from the rest of those columns (or rows).
+
+        Parameters
+        ----------
+        size : int
+            2 for X-Wings or 3 for Swordfish.
+
+        Return
+        ------
+        A list with one Step, or an empty list.
+        '''
+        candidates = self.candidates
+        technique = 'x-wing' if size == 2 else 'swordfish'
+        # the rows and columns are the first 18 units
+        packed = [self.positions(unit_idx) for unit_idx in range(18)]
+        for num in range(1, 10):
+            bit = 1 << (num - 1)
+            for base_units, cover_units, first in ((ROW_CELLS, COL_CELLS, 0), (COL_CELLS, ROW_CELLS, 9)):
+                # positions[i] is a 9-bit mask of where num can go in base unit i
+                positions = {}
+                for idx in range(9):
+                    mask = packed[first + idx] >> 9*(num - 1) & ALL_CANDIDATES
+                    if 2 <= mask.bit_count() <= size:
+                        positions[idx] = mask
+                if len(positions) < size:
+                    continue
+                for bases in combinations(positions, size):
+                    union = 0
+                    for idx in bases:
+                        union |= positions[idx]
+                    if union.bit_count() != size:
+                        continue
+                    covers = [pos for pos in range(9) if union & (1 << pos)]
+                    eliminations = tuple(
+                        (cell, num)
+                        for pos in covers
+                        for idx, cell in enumerate(cover_units[pos])
+                        if idx not in bases and candidates[cell] & bit
+                    )
+                    if eliminations:
+                        justification = tuple(base_units[idx][pos] for idx in bases for pos in covers if candidates[base_units[idx][pos]] & bit)
+                        return [Step(technique, (), eliminations, justification)]
+        return []
+
+    def xy_wings(self) -> list[Step]:
+        '''
+        Finds a pivot cell with candidates {x, y} that sees two pincer cells with candidates {x, z} and {y, z}. Whichever value the pivot takes, one pincer is z, so z can be removed from every cell that sees both pincers.
+
+        Return
+        ------
+        A list with one Step, or an empty list.
+        '''
+        candidates = self.candidates
+        bivalue = [cell for cell in range(81) if candidates[cell].bit_count() == 2]
+        for pivot in bivalue:
+            pivot_mask = candidates[pivot]
+            wings = [cell for cell in bivalue if cell in PEER_SETS[pivot] and (candidates[cell] & pivot_mask).bit_count() == 1]
+            for first, second in combinations(wings, 2):
+                z = candidates[first] & candidates[second] & ~pivot_mask
+                if not z or (candidates[first] | candidates[second]) & pivot_mask != pivot_mask:
+                    continue
+                num = z.bit_length()
+                eliminations = tuple(
+                    (cell, num)
+                    for cell in PEER_SETS[first] & PEER_SETS[second]
+                    if cell != pivot and candidates[cell] & z
+                )
+                if eliminations:
+                    return [Step('xy-wing', (), tuple(sorted(eliminations)), (pivot, first, second))]
+        return []
+
+    def find_steps(self) -> list[Step]:
+        '''
+        Returns the deductions of the easiest technique that applies to the current board. Singles are returned all at once; other techniques return their first deduction.
+
+        Return
+        ------
+        A list of Steps, empty if no technique applies or the board is invalid.
+        '''
+        for technique, finder in self.finders:
+            steps = finder()
+            if self.status == 'contradiction':
+                return []
+            if steps:
+                return steps
+        return []
+
+    def solve(self) -> str:
+        '''
+        Applies deductions until the puzzle is solved, no technique applies or the board turns out to be invalid.
+
+        Return
+        ------
+        The status (str): 'solved', 'stuck' or 'contradiction'.
+        '''
+        while self.remaining and self.status != 'contradiction':
+            steps = self.find_steps()
+            if not steps:
+                if self.status != 'contradiction':
+                    self.status = 'stuck'
+                return self.status
+            for step in steps:
+                self.apply(step)
+        if self.status != 'contradiction':
+            self.status = 'solved'
+        return self.status
+
+    def grade(self) -> Grade:
+        '''
+        Solves the puzzle and returns its Grade. The rating is the rating of the hardest technique that was needed, or UNSOLVED_RATING if the puzzle could not be solved with these techniques.
+
+        Return
+        ------
+        A Grade.
+        '''
+        solved = self.solve() == 'solved'
+        if solved:
+            rating = max((TECHNIQUE_RATINGS[technique] for technique in self.counts), default=0.0)
+        else:
+            rating = UNSOLVED_RATING
+        return Grade(rating, difficulty_band(rating), dict(self.counts), solved)
+
+class HintEngine(LogicalSolver):
+    '''
+    Gives the next logical deduction for a board that is being filled in, e.g., by the GUI. The candidates, including the eliminations found for earlier hints, are kept between calls and only the cells that changed since the last call (and their peers) are updated, so a hint costs time in proportion to the change and to the deductions needed, not a full solve.
+
+    Attributes
+    ----------
+    solution : list
+        The 81 solution values, or None if the puzzle matrix did not include them (i.e., had no negative values). Entries that disagree with the solution are reported as mistakes instead of being reasoned from.
+
+    eliminated : list
+        The 81 masks of the candidates removed by deductions (as opposed to by the values of the peers).
+
+    mistakes : list
+        The cells whose entries disagree with the solution, as of the last call to hint().
+
+    Methods
+    -------
+    update(board):
+        Brings the values and candidates up to date with a board.
+
+    free_candidates(cell):
+        Returns the candidates of an empty cell from its peers and the eliminations.
+
+    unplace(cell):
+        Clears a cell and gives its number back to the candidates of the cell's peers.
+
+    hint(board=None):
+        Returns the next placement that can be deduced.
+    '''
+    def __init__(self, matrix: np.array) -> None:
+        super().__init__(matrix)
+        matrix = np.asarray(matrix).ravel()
+        self.solution = np.abs(matrix).tolist() if (matrix < 0).any() else None
+        self.eliminated = [0] * 81
+        self.mistakes = []
+
+    def update(self, board: np.array) -> int:
+        '''
+        Brings the values and candidates up to date with a board, by clearing the cells that were emptied or changed and placing the new numbers.
+
+        Parameters
+        ----------
+        board : np.array
+            A 9x9 matrix of the givens and the user's entries. Zero (or a negative value) means the cell is empty.
+
+        Return
+        ------
+        The number of cells that changed (int).
+        '''
+        board = np.maximum(np.asarray(board).ravel(), 0).tolist()
+        changed = [cell for cell in range(81) if board[cell] != self.values[cell]]
+        removed = [cell for cell in changed if self.values[cell]]
+        for cell in removed:
+            self.unplace(cell)
+        if removed and self.solution is None:
+            # without the solution, eliminations found with a removed entry may be wrong
+            self.eliminated = [0] * 81
+            for cell in range(81):
+                if not self.values[cell]:
+                    self.candidates[cell] = self.free_candidates(cell)
+        for cell in changed:
+            if board[cell]:
+                self.place(cell, board[cell])
+        return len(changed)
+
+    def free_candidates(self, cell: int) -> int:
+        '''
+        Returns the candidates of an empty cell: the numbers not used by its peers and not eliminated by a deduction.
+
+        Parameters
+        ----------
+        cell : int
+            The cell index. Range: [0,81).
+
+        Return
+        ------
+        A candidate mask (int).
+        '''
+        values = self.values
+        used = 0
+        for peer in PEERS[cell]:
+            if values[peer]:
+                used |= 1 << (values[peer] - 1)
+        return ALL_CANDIDATES & ~used & ~self.eliminated[cell]
+
+    def unplace(self, cell: int) -> None:
+        '''
+        Clears a cell and gives its number back to the candidates of the cell's peers that no other peer rules out.
+
+        Parameters
+        ----------
+        cell : int
+            The cell index. Range: [0,81).
+
+        Return
+        ------
+        None
+        '''
+        bit = 1 << (self.values[cell] - 1)
+        self.values[cell] = 0
+        self.remaining += 1
+        self.candidates[cell] = self.free_candidates(cell)
+        for peer in PEERS[cell]:
+            if not self.values[peer] and not self.candidates[peer] & bit:
+                self.candidates[peer] = self.free_candidates(peer)
+
+    def hint(self, board: np.array = None) -> Step:
+        '''
+        Returns the next placement that can be deduced from the board with the techniques of LogicalSolver, easiest first. Deductions that only remove candidates are applied along the way and remembered for later hints; the placement itself is left to the user.
+
+        Parameters
+        ----------
+        board : np.array, optional
+            A 9x9 matrix of the givens and the user's entries (see update()). Defaults to None (the board of the last call).
+
+        Return
+        ------
+        A Step with one placement, or None if the board is solved, has mistakes (see mistakes and status) or no technique applies.
+        '''
+        if board is not None:
+            self.update(board)
+
+        if self.solution is not None:
+            self.mistakes = [cell for cell in range(81) if self.values[cell] and self.values[cell] != self.solution[cell]]
+            if self.mistakes:
+                self.status = 'contradiction'
+                return None
+
+        self.status = 'unsolved'
+        while self.remaining and self.status != 'contradiction':
+            steps = self.find_steps()
+            if not steps:
+                if self.status != 'contradiction':
+                    self.status = 'stuck'
+                return None
+            if steps[0].placements:
+                return steps[0]
+            for step in steps:
+                for cell, num in step.eliminations:
+                    self.eliminated[cell] |= 1 << (num - 1)
+                self.apply(step)
+        if not self.remaining:
+            self.status = 'solved'
+        return None
+
+# the other two rows of the band of each row, and the rows of the other two bands
+BAND_OTHERS = np.array([[other for other in range(row//3*3, row//3*3 + 3) if other != row] for row in range(9)])
+BAND_REST = np.array([[other for other in range(9) if other//3 != row//3] for row in range(9)])
+
+# weights that turn a row of values 0-8 into a single integer that sorts like the row
+ROW_WEIGHTS = 10**np.arange(8, -1, -1)
+
+# the first bands that minlex_candidates() tries: row PAIR_TOPS of the grid (of the transposed grid if 9 or more) becomes the first row, row PAIR_BANDS[:, 0] of its band the second and row PAIR_BANDS[:, 1] the third
+PAIR_TOPS = np.repeat(np.arange(18), 2)
+PAIR_BANDS = np.tile(np.stack([BAND_OTHERS, BAND_OTHERS[:, ::-1]], axis=1), (2, 1, 1)).reshape(-1, 2)
+
+# weights that turn a permutation of 0-8 into a single integer
+PERM_WEIGHTS = 9**np.arange(8, -1, -1)
+
+# the number of puzzles canonical_puzzles() passes to minlex_search() at a time, which keeps the candidate arrays small
+SEARCH_BATCH_SIZE = 256
+
+# the columns of the search state of second_row_search(): perm[position] is the column there and place[col] the position of a column (-1 while not placed), filled[block] the number of positions of a block that are taken (always its first ones), and block[stack] the position of a stack and stacks[block] the stack there
+SEARCH_PERM, SEARCH_PLACE, SEARCH_FILLED, SEARCH_BLOCK, SEARCH_STACKS = np.arange(9), 9 + np.arange(9), 18 + np.arange(3), 21 + np.arange(3), 24 + np.arange(3)
+SEARCH_STATE_SIZE = 27
+
+def group_starts(owners: np.array) -> np.array:
+    '''
+    Returns where each run of equal values starts in a sorted array, e.g., the first candidate of each grid in minlex_candidates().
+
+    Parameters
+    ----------
+    owners : np.array
+        A non-empty sorted 1D array.
+
+    Return
+    ------
+    An array of indices.
+    '''
+    return np.flatnonzero(np.concatenate([[True], owners[1:] != owners[:-1]]))
+
+def keep_lowest(values: np.array, owners: np.array) -> np.array:
+    '''
+    Marks the values that are the lowest of their group, e.g., the candidates of minlex_candidates() that are still smallest for their grid.
+
+    Parameters
+    ----------
+    values : np.array
+        A 1D array of values.
+
+    owners : np.array
+        The group of each value, sorted.
+
+    Return
+    ------
+    A bool array.
+    '''
+    starts = group_starts(owners)
+    return values == np.repeat(np.minimum.reduceat(values, starts), np.diff(np.append(starts, len(values))))
+
+def second_row_search(targets: np.array, pairs: np.array, first_cols: np.array, owners: np.array) -> tuple:
+    '''
+    Finds the column permutations that make the second row of a band smallest once the first row is relabeled to 012345678, keeping the candidates that are smallest for their owner.
+
+    The first column x makes the second row start with a 3 when the column of the first row with the same value starts the second stack, which puts the stacks in the order of x, of that column and the other one. The more of the other columns of the stack of x hold values from the second stack, the smaller the rest of the first box (345, 346 or 367), so only the candidates with the most are searched. From each of them, the permutation is built one position of the second row at a time: the value at a position is smallest when the column of the first row that holds it takes the first free position of its stack, so only the choice of column at positions that are still free branches. The second row fixes the whole permutation.
+
+    Parameters
+    ----------
+    targets : np.array
+        A Px9 array where targets[pair, col] is the column of the first row that holds the value of the second row at col.
+
+    pairs : np.array
+        The row of targets of each candidate.
+
+    first_cols : np.array
+        The first column of each candidate.
+
+    owners : np.array
+        The owner of each candidate (e.g., the grid), sorted.
+
+    Return
+    ------
+    A tuple (state, pairs, owners) of the search state (see SEARCH_PERM, SEARCH_PLACE, ...) and the pair and owner of each remaining candidate.
+    '''
+    second_cols = targets[pairs, first_cols]
+    stack_cols = first_cols[:, None] // 3 * 3 + np.arange(3)
+    matches = (targets[pairs[:, None], stack_cols] // 3 == second_cols[:, None] // 3).sum(axis=1)
+    keep = keep_lowest(-matches, owners)
+    pairs, first_cols, second_cols, owners = pairs[keep], first_cols[keep], second_cols[keep], owners[keep]
+
+    cand = np.arange(len(pairs))
+    state = np.full((len(pairs), SEARCH_STATE_SIZE), -1, dtype=np.int8)
+    state[:, SEARCH_STACKS] = np.column_stack([first_cols // 3, second_cols // 3, 3 - first_cols // 3 - second_cols // 3])
+    state[:, SEARCH_BLOCK] = np.argsort(state[:, SEARCH_STACKS], axis=1)
+    state[:, SEARCH_PERM[0]], state[cand, SEARCH_PLACE[first_cols]] = first_cols, 0
+    state[:, SEARCH_PERM[3]], state[cand, SEARCH_PLACE[second_cols]] = second_cols, 3
+    state[:, SEARCH_FILLED] = [1, 1, 0]
+
+    for position in range(1, 9):
+        # the column at this position is either already placed (as the target of an earlier column) or any free column of the stack of this block
+        placed = state[:, position, None]
+        options = state[:, SEARCH_STACKS[position // 3], None]*3 + np.arange(3)
+        valid = np.where(placed >= 0, np.arange(3) == 0, np.take_along_axis(state[:, SEARCH_PLACE], options, axis=1) < 0)
+        rows, option = np.nonzero(valid)
+        chosen = np.where(placed >= 0, placed, options)[rows, option]
+        state, pairs, owners = state[rows], pairs[rows], owners[rows]
+        cand = np.arange(len(state))
+
+        # the value here is the position of the target of the chosen column, which takes the first free position of its stack if it is not placed yet
+        target = targets[pairs, chosen]
+        target_block = state[cand, SEARCH_BLOCK[target // 3]]
+        free = state[cand, SEARCH_PLACE[target]] < 0
+        values = np.where(free, target_block*3 + state[cand, SEARCH_FILLED[target_block]], state[cand, SEARCH_PLACE[target]])
+        keep = keep_lowest(values, owners)
+
+        state, pairs, owners, chosen, target, target_block, free, values = (
+            array[keep] for array in (state, pairs, owners, chosen, target, target_block, free, values)
+        )
+        cand = np.arange(len(state))
+        new = cand[state[:, position] < 0]
+        state[new, position], state[new, SEARCH_PLACE[chosen[new]]] = chosen[new], position
+        state[new, SEARCH_FILLED[position // 3]] += 1
+        free = cand[free]
+        state[free, values[free]], state[free, SEARCH_PLACE[target[free]]] = target[free], values[free]
+        state[free, SEARCH_FILLED[target_block[free]]] += 1
+    return state, pairs, owners
+
+@cache
+def second_row_table() -> tuple:
+    '''
+    Tabulates the smallest second row of a band for every way its second row can be laid out against its first (see second_row_search()). The values of the second row in each box come from the other two boxes of the first row, so there are 12096 ways. The table is built on first use, which takes a fraction of a second.
+
+    Return
+    ------
+    A tuple (keys, codes) of the sorted PERM_WEIGHTS keys of the targets (see second_row_search()) and the ROW_WEIGHTS code of the smallest second row for each.
+    '''
+    targets = np.zeros((1, 0), dtype=np.int8)
+    for col in range(9):
+        options = np.array([target for target in range(9) if target // 3 != col // 3], dtype=np.int8)
+        grown = np.repeat(targets, len(options), axis=0)
+        added = np.tile(options, len(targets))
+        targets = np.column_stack([grown, added])[(grown != added[:, None]).all(axis=1)]
+
+    pairs = np.repeat(np.arange(len(targets)), 9)
+    state, pairs, owners = second_row_search(targets, pairs, np.tile(np.arange(9), len(targets)), pairs)
+    firsts = group_starts(owners)
+    rows = np.take_along_axis(state[firsts][:, SEARCH_PLACE], targets[pairs[firsts]][np.arange(len(firsts))[:, None], state[firsts][:, SEARCH_PERM]], axis=1)
+    keys = targets.astype(np.int64) @ PERM_WEIGHTS
+    order = np.argsort(keys)
+    return keys[order], (rows.astype(np.int64) @ ROW_WEIGHTS)[order]
+
+# the code of the second row of BASE_SOLUTION once its first row is relabeled to 012345678, which is as small as a second row can be
+BASE_SECOND_ROW_CODE = np.array([3, 4, 5, 6, 7, 8, 0, 1, 2]) @ ROW_WEIGHTS
+
+def minlex_candidates(grids: np.array, shortcut: bool = True) -> tuple:
+    '''
+    Searches for the minlex forms of a batch of solution grids and the transformations that produce them (see minlex_search()).
+
+    Since the relabeling can always make the first row 123456789, a transformation is fixed by the transposition, the rows of the first band and the column permutation; the rest of the rows are then best sorted. The smallest second row of each of the 36 first bands of a grid is looked up in second_row_table(), and only the first bands whose second row is smallest for the grid are searched (see second_row_search()). The third row and the other two bands then only need to be compared. The candidates of all the grids are searched together, so each step is a handful of numpy operations however many grids there are.
+
+    Parameters
+    ----------
+    grids : np.array
+        A 9x9 or Nx9x9 array of solution grids. Negative values (hidden values of a puzzle) are read as their absolute values.
+
+    shortcut : bool, optional
+        For grids whose first band can be made as small as that of BASE_SOLUTION, only try the first of the first bands that do so (see minlex_search()). Defaults to True.
+
+    Return
+    ------
+    A tuple (minlex, owners, transposed, row_orders, col_perms, shortcut) as returned by minlex_search(), and a bool array that is True for the grids that took the shortcut. The minlex forms of those grids are only the smallest grids found, and their transformations only the ones found.
+    '''
+    grids = np.abs(np.asarray(grids)).reshape(-1, 9, 9) - 1
+    count = len(grids)
+    boxes = grids.reshape(-1, 3, 3, 3, 3).transpose(0, 1, 3, 2, 4).reshape(-1, 9, 9)
+    units = np.concatenate([grids, grids.transpose(0, 2, 1), boxes], axis=1)
+    if not (np.sort(units, axis=2) == np.arange(9)).all():
+        raise ValueError('grids must be complete, valid solutions')
+
+    grids = np.stack([grids, grids.transpose(0, 2, 1)], axis=1)
+    positions = np.argsort(grids, axis=3)
+    # cols[n*18 + t*9 + top, row, col] is the column of row top of grids[n, t] that holds the value at (row, col), i.e., the value at (row, col) once the numbers are relabeled to make row top 012345678
+    cols = np.take_along_axis(positions[:, :, :, None, :], grids[:, :, None, :, :], axis=4).reshape(-1, 9, 9).astype(np.int8)
+
+    # look up the smallest second row of every first band and keep the smallest of each grid
+    owners = np.repeat(np.arange(count), len(PAIR_TOPS))
+    tops = owners*18 + np.tile(PAIR_TOPS, count)
+    targets = cols[tops, np.tile(PAIR_BANDS[:, 0], count)]
+    keys, codes = second_row_table()
+    codes = codes[np.searchsorted(keys, targets.astype(np.int64) @ PERM_WEIGHTS)]
+    keep = keep_lowest(codes, owners)
+    firsts = group_starts(owners[keep])
+    took_shortcut = np.zeros(count, dtype=bool)
+    if shortcut:
+        took_shortcut = codes[keep][firsts] == BASE_SECOND_ROW_CODE
+        keep &= ~took_shortcut[owners] | (np.arange(len(keep)) == np.repeat(np.flatnonzero(keep)[firsts], len(PAIR_TOPS)))
+    pairs = np.flatnonzero(keep)
+
+    state, pairs, owners = second_row_search(targets, np.repeat(pairs, 9), np.tile(np.arange(9), len(pairs)), np.repeat(owners[pairs], 9))
+    tops, perm, place = tops[pairs], state[:, SEARCH_PERM].astype(np.intp), state[:, SEARCH_PLACE]
+    seconds, thirds = PAIR_BANDS[pairs % len(PAIR_TOPS), 0], PAIR_BANDS[pairs % len(PAIR_TOPS), 1]
+
+    # the third row is fixed by the column permutation too
+    codes = np.take_along_axis(place, cols[tops, thirds][np.arange(len(tops))[:, None], perm], axis=1) @ ROW_WEIGHTS
+    keep = keep_lowest(codes, owners)
+    owners, tops, seconds, thirds, perm, place = owners[keep], tops[keep], seconds[keep], thirds[keep], perm[keep], place[keep]
+
+    # relabel the other two bands, sort the rows within each band and then the bands by their first rows
+    cand = np.arange(len(tops))[:, None, None]
+    rest = BAND_REST[tops % 9]
+    values = place[cand, cols[tops[:, None, None], rest[:, :, None], perm[:, None, :]]]
+    codes = (values @ ROW_WEIGHTS).reshape(-1, 2, 3)
+    row_order = np.argsort(codes, axis=2)
+    codes = np.take_along_axis(codes, row_order, axis=2)
+    band_order = np.argsort(codes[:, :, 0], axis=1)
+    codes = np.take_along_axis(codes, band_order[:, :, None], axis=1).reshape(-1, 6)
+    rest = np.take_along_axis(rest.reshape(-1, 2, 3), row_order, axis=2)
+    rest = np.take_along_axis(rest, band_order[:, :, None], axis=1).reshape(-1, 6)
+
+    # keep the candidates whose rows match the smallest of their grid
+    order = np.lexsort(np.column_stack([owners, codes]).T[::-1])
+    firsts = order[group_starts(owners[order])]
+    keep = (codes == codes[firsts][owners]).all(axis=1)
+    row_orders = np.column_stack([tops % 9, seconds, thirds, rest])
+
+    minlex = np.take_along_axis(
+        place[firsts][:, None, :],
+        cols[tops[firsts][:, None, None], row_orders[firsts][:, :, None], perm[firsts][:, None, :]],
+        axis=2,
+    ) + 1
+    return minlex, owners[keep], tops[keep] % 18 >= 9, row_orders[keep], perm[keep], took_shortcut
+
+@cache
+def base_automorphisms() -> tuple:
+    '''
+    Returns the automorphisms of BASE_SOLUTION: it is its own minlex form, so they are the 54 transformations that produce it.
+
+    Return
+    ------
+    A tuple (transposed, row_orders, col_perms) as in minlex_search().
+    '''
+    return minlex_candidates(BASE_SOLUTION, shortcut=False)[2:5]
+
+def minlex_search(grids: np.array) -> tuple:
+    '''
+    Finds the minlex forms of a batch of solution grids: for each grid, the lexicographically smallest grid (read row by row) that it can be turned into by transposing, permuting the bands, the rows within a band, the stacks and the columns within a stack, and relabeling the numbers. Also returns every transformation that produces them (more than one when a grid has automorphisms), so that puzzles on the grids can be canonicalized too (see canonical_puzzles()).
+
+    The grids of the 'transform' strategy are isomorphic to BASE_SOLUTION, whose symmetry leaves hundreds of candidates tied until the last bands, so grids whose first band can be made as small as that of BASE_SOLUTION are first searched with only one first band (see minlex_candidates()). Every first band of BASE_SOLUTION that is as small as its own is its first band under some automorphism, so a grid isomorphic to it reaches BASE_SOLUTION from any of its smallest first bands. A grid that reaches BASE_SOLUTION that way is isomorphic to it: its minlex form is BASE_SOLUTION and its transformations are the one found followed by each automorphism of BASE_SOLUTION. The other grids that took the shortcut are searched again in full.
+
+    Parameters
+    ----------
+    grids : np.array
+        A 9x9 or Nx9x9 array of solution grids. Negative values (hidden values of a puzzle) are read as their absolute values.
+
+    Return
+    ------
+    A tuple (minlex, owners, transposed, row_orders, col_perms) of the Nx9x9 minlex grids and, for each of the K transformations that produce them, the grid it belongs to (int array of length K, sorted), whether the grid is transposed (bool array of length K), the order of its rows (Kx9) and the order of its columns (Kx9) before relabeling.
+    '''
+    grids = np.asarray(grids).reshape(-1, 9, 9)
+    minlex, owners, transposed, row_orders, col_perms, shortcut = minlex_candidates(grids)
+    if not shortcut.any():
+        return minlex, owners, transposed, row_orders, col_perms
+
+    keep = ~shortcut[owners]
+    found = [(owners[keep], transposed[keep], row_orders[keep], col_perms[keep])]
+
+    # apply each automorphism after the first transformation found: (X[r][:, p])[ra][:, pa] is X[r[ra]][:, p[pa]] and its transpose is X.T[p][:, r], so a transposing automorphism swaps the roles of r and p
+    base = shortcut & (minlex == BASE_SOLUTION).all(axis=(1, 2))
+    if base.any():
+        base_transposed, base_rows, base_perms = base_automorphisms()
+        firsts = group_starts(owners)[base]
+        rows, perms = row_orders[firsts][:, base_rows], col_perms[firsts][:, base_perms]
+        rows_t, perms_t = col_perms[firsts][:, base_rows], row_orders[firsts][:, base_perms]
+        flip = base_transposed[None, :, None]
+        found.append((
+            np.repeat(owners[firsts], len(base_transposed)),
+            (transposed[firsts, None] ^ base_transposed).reshape(-1),
+            np.where(flip, rows_t, rows).reshape(-1, 9),
+            np.where(flip, perms_t, perms).reshape(-1, 9),
+        ))
+
+    redo = np.flatnonzero(shortcut & ~base)
+    if len(redo):
+        minlex[redo], owners, transposed, row_orders, col_perms = minlex_candidates(grids[redo], shortcut=False)[:5]
+        found.append((redo[owners], transposed, row_orders, col_perms))
+
+    owners, transposed, row_orders, col_perms = (np.concatenate(arrays) for arrays in zip(*found))
+    order = np.argsort(owners, kind='stable')
+    return minlex, owners[order], transposed[order], row_orders[order], col_perms[order]
+
+def minlex_transforms(grid: np.array) -> tuple:
+    '''
+    Finds the minlex form of a single solution grid and every transformation that produces it (see minlex_search()).
+
+    Parameters
+    ----------
+    grid : np.array
+        A 9x9 solution grid.
+
+    Return
+    ------
+    A tuple (minlex, transposed, row_orders, col_perms) of the 9x9 minlex grid and, for each of the K transformations that produce it, whether the grid is transposed (bool array of length K), the order of its rows (Kx9) and the order of its columns (Kx9) before relabeling.
+    '''
+    minlex, owners, transposed, row_orders, col_perms = minlex_search(grid)
+    return minlex[0], transposed, row_orders, col_perms
+
+def minlex_grid(grid: np.array) -> np.array:
+    '''
+    Returns the minlex form of a solution grid (see minlex_search()). Two grids are isomorphic if and only if they have the same minlex form.
+
+    Parameters
+    ----------
+    grid : np.array
+        A 9x9 solution grid.
+
+    Return
+    ------
+    A 9x9 matrix.
+    '''
+    return minlex_search(grid)[0][0]
+
+def canonical_puzzles(puzzles: np.array) -> np.array:
+    '''
+    Returns the canonical forms of a batch of puzzle matrices, in which the hidden values are negated: the minlex form of each solution, with the clue layout that comes first (hidden cells before shown ones) among the transformations that produce it. Two puzzles with unique solutions are isomorphic if and only if they have the same canonical form. The puzzles are searched SEARCH_BATCH_SIZE at a time (see minlex_search()), so canonicalizing many puzzles in one call is much faster than one at a time.
+
+    Parameters
+    ----------
+    puzzles : np.array
+        A 9x9 or Nx9x9 array of puzzle matrices with the hidden values negated (e.g., SudokuPuzzle.puzzle).
+
+    Return
+    ------
+    An Nx9x9 array of puzzle matrices.
+    '''
+    puzzles = np.asarray(puzzles).reshape(-1, 9, 9)
+    canonical = np.empty(puzzles.shape, dtype=np.int8)
+    for start in range(0, len(puzzles), SEARCH_BATCH_SIZE):
+        batch = puzzles[start:start + SEARCH_BATCH_SIZE]
+        minlex, owners, transposed, row_orders, col_perms = minlex_search(batch)
+
+        shown = np.stack([batch > 0, (batch > 0).transpose(0, 2, 1)], axis=1).reshape(-1, 9, 9)
+        shown = shown[(owners*2 + transposed)[:, None, None], row_orders[:, :, None], col_perms[:, None, :]]
+        # pack each layout into two big-endian integers that sort like it, and keep the smallest of each puzzle
+        words = np.packbits(shown.reshape(-1, 81), axis=1)
+        words = np.pad(words, ((0, 0), (0, 16 - words.shape[1]))).view('>u8')
+        order = np.lexsort((words[:, 1], words[:, 0], owners))
+        layouts = shown[order[group_starts(owners[order])]]
+        canonical[start:start + SEARCH_BATCH_SIZE] = np.where(layouts, minlex, -minlex)
+    return canonical
+
+def canonical_puzzle(puzzle: np.array) -> np.array:
+    '''
+    Returns the canonical form of a single puzzle matrix (see canonical_puzzles()).
+
+    Parameters
+    ----------
+    puzzle : np.array
+        A 9x9 puzzle matrix with the hidden values negated (e.g., SudokuPuzzle.puzzle).
+
+    Return
+    ------
+    A 9x9 puzzle matrix.
+    '''
+    return canonical_puzzles(puzzle)[0]
+
+def canonical_keys(puzzles: np.array) -> list[bytes]:
+    '''
+    Returns a 16 byte hash of the canonical form of each puzzle in a batch (see canonical_puzzles()), to be used as dictionary or database keys.
+
+    Parameters
+    ----------
+    puzzles : np.array
+        A 9x9 or Nx9x9 array of puzzle matrices with the hidden values negated.
+
+    Return
+    ------
+    A list of N bytes objects.
+    '''
+    return [blake2b(canonical.tobytes(), digest_size=16).digest() for canonical in canonical_puzzles(puzzles)]
+
+def canonical_key(puzzle: np.array) -> bytes:
+    '''
+    Returns a 16 byte hash of the canonical form of a single puzzle matrix (see canonical_keys()).
+
+    Parameters
+    ----------
+    puzzle : np.array
+        A 9x9 puzzle matrix with the hidden values negated.
+
+    Return
+    ------
+    A bytes object.
+    '''
+    return canonical_keys(puzzle)[0]
+
+class DedupIndex:
+    '''
+    Remembers the canonical keys (see canonical_key()) of the puzzles added to it, to drop puzzles that are isomorphic to one seen before, i.e., that only differ by relabeling the numbers, permuting rows or columns within bands or stacks, permuting bands or stacks, or transposing.
+
+    Keys are 16 bytes, so the index holds a few million puzzles in a few hundred megabytes. Canonicalizing is by far the costly part and is much faster in batches, so add_key() lets worker processes compute the keys of whole chunks with canonical_keys() and the index only check them.
+
+    Attributes
+    ----------
+    keys : set
+        The keys seen so far.
+
+    Methods
+    -------
+    add(puzzle):
+        Adds a puzzle matrix and returns whether it was new.
+
+    add_key(key):
+        Adds a key computed by canonical_key() and returns whether it was new.
+    '''
+    def __init__(self) -> None:
+        self.keys = set()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, puzzle: np.array) -> bool:
+        return canonical_key(puzzle) in self.keys
+
+    def add(self, puzzle: np.array) -> bool:
+        '''
+        Adds a puzzle matrix to the index.
+
+        Parameters
+        ----------
+        puzzle : np.array
+            A 9x9 puzzle matrix with the hidden values negated.
+
+        Return
+        ------
+        True if no isomorphic puzzle had been added before, False otherwise.
+        '''
+        return self.add_key(canonical_key(puzzle))
+
+    def add_key(self, key: bytes) -> bool:
+        '''
+        Adds the canonical key of a puzzle to the index.
+
+        Parameters
+        ----------
+        key : bytes
+            A key computed by canonical_key().
+
+        Return
+        ------
+        True if the key is new, False otherwise.
+        '''
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        return True
+
+# the number of clues generate() carves puzzles down to for each difficulty band
+BAND_CLUES = {
+    'easy': 32,
+    'medium': 26,
+    'hard': 24,
+    'expert': 23,
+    'diabolical': 22,
+}
+
+# the number of puzzles generate_in_band() tries for each puzzle before giving up on the band. Only a few percent of the puzzles carved for 'expert' (the rarest band) land in it, about 4% with the 'placement' strategy and 2% with 'transform', so this only runs out when the band cannot be reached
+MAX_BAND_ATTEMPTS = 1000
+
+def generate_in_band(difficulty: str, count: int, seed: int, start: int = 0, strategy: str = 'placement', max_attempts: int = MAX_BAND_ATTEMPTS) -> list:
+    '''
+    Generates puzzles number start to start+count-1 of a run in the given difficulty band. Puzzle number index is generated and graded repeatedly with the random stream from puzzle_rng(seed, index) until one falls in the band, so it does not depend on how the run is split into chunks. This is the unit of work that generate() hands to each worker process.
+
+    Parameters
+    ----------
+    difficulty : str
+        The difficulty band (a key of DIFFICULTY_BANDS).
+
+    count : int
+        The number of puzzles to return.
+
+    seed : int
+        The seed of the run.
+
+    start : int, optional
+        The index of the first puzzle. Defaults to 0.
+
+    strategy : str, optional
+        The SudokuSolution strategy used to build the solutions. Defaults to 'placement' (see generate()).
+
+    max_attempts : int, optional
+        The number of puzzles to try for each puzzle returned. Defaults to MAX_BAND_ATTEMPTS.
+
+    Return
+    ------
+    A list of count graded SudokuPuzzle objects. A RuntimeError is raised if none of max_attempts puzzles falls in the band.
+    '''
+    puzzles = []
+    for index in range(start, start + count):
+        rng = RandomStream(puzzle_rng(seed, index))
+        for _ in range(max_attempts):
+            puzzle = SudokuPuzzle(strategy=strategy, clues=BAND_CLUES[difficulty], rng=rng)
+            if puzzle.grade_puzzle().band == difficulty:
+                puzzles.append(puzzle)
+                break
+        else:
+            raise RuntimeError(f'no {difficulty} puzzle found for puzzle {index} of seed {seed} in {max_attempts} attempts with {BAND_CLUES[difficulty]} clues')
+    return puzzles
+
+def iter_pool(func, tasks, jobs: int = None, ordered: bool = False) -> Iterator:
+    '''
+    Runs func(*task) for each task in a process pool and yields the results as they finish (or in task order if ordered is True). At most 2*jobs tasks are in flight at a time and tasks are only drawn from the iterable as earlier ones finish, so memory stays flat however many tasks there are. If the caller stops iterating, the tasks that have not started are cancelled.
+
+    Parameters
+    ----------
+    func : callable
+        A module-level function (so that it can be sent to the worker processes).
+
+    tasks : iterable
+        An iterable of argument tuples for func.
+
+    jobs : int, optional
+        The number of worker processes. Defaults to None (one per CPU). With jobs=1 the tasks run in this process.
+
+    ordered : bool, optional
+        Yield the results in task order rather than as they finish. Defaults to False.
+
+    Return
+    ------
+    An iterator over the results of func.
+    '''
+    tasks = iter(tasks)
+    if jobs == 1:
+        for task in tasks:
+            yield func(*task)
+        return
+
+    jobs = jobs or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        in_flight = 2 * jobs
+        pending = deque(pool.submit(func, *task) for task in islice(tasks, in_flight))
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done = [future for future in pending if future in finished]
+                for future in done:
+                    pending.remove(future)
+
+            for task in islice(tasks, len(done)):
+                pending.append(pool.submit(func, *task))
+            for future in done:
+                yield future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def generate(difficulty: str = 'easy', count: int = 1, jobs: int = None, chunk_size: int = 4, seed: int = None, strategy: str = 'placement', max_attempts: int = MAX_BAND_ATTEMPTS) -> Iterator[SudokuPuzzle]:
+    '''
+    Generates count puzzles in the given difficulty band, spreading the generating and grading over a pool of worker processes. The work is split into chunks of chunk_size puzzles. Each worker keeps generating until its chunk is complete, and the puzzles are yielded as soon as their chunk finishes.
+
+    Parameters
+    ----------
+    difficulty : str, optional
+        The difficulty band (a key of DIFFICULTY_BANDS). Defaults to 'easy'.
+
+    count : int, optional
+        The number of puzzles to generate. Defaults to 1.
+
+    jobs : int, optional
+        The number of worker processes. Defaults to None (one per CPU).
+
+    chunk_size : int, optional
+        The number of puzzles each task generates. Smaller chunks stream results sooner, larger chunks spend less time passing work to the workers. Defaults to 4.
+
+    seed : int, optional
+        The seed of the run. Puzzle number index is generated from puzzle_rng(seed, index), so a seed reproduces the same puzzles with any jobs or chunk_size. Defaults to None (a fresh random seed).
+
+    strategy : str, optional
+        The SudokuSolution strategy used to build the solutions. Defaults to 'placement', which builds every solution from scratch, so the puzzles are carved from many different grids. 'transform' builds solutions an order of magnitude faster, but they are all shuffles of BASE_SOLUTION, so every puzzle is carved from the same grid up to isomorphism; use it only when that lack of variety does not matter.
+
+    max_attempts : int, optional
+        The number of puzzles a worker tries for each puzzle in the band before giving up (see generate_in_band()). Defaults to MAX_BAND_ATTEMPTS.
+
+    Return
+    ------
+    An iterator over count graded SudokuPuzzle objects. The RuntimeError of a worker that gives up on the band is raised here.
+    '''
+    if difficulty not in DIFFICULTY_BANDS:
+        raise ValueError(f'difficulty must be one of {tuple(DIFFICULTY_BANDS)}, not {difficulty!r}')
+    if chunk_size < 1:
+        raise ValueError(f'chunk_size must be at least 1, not {chunk_size}')
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+
+    tasks = ((difficulty, min(chunk_size, count - start), seed, start, strategy, max_attempts) for start in range(0, count, chunk_size))
+    for puzzles in iter_pool(generate_in_band, tasks, jobs=jobs):
+        yield from puzzles
+
+def puzzle_line(puzzle: np.array) -> str:
+    '''
+    Converts a 9x9 puzzle matrix into the common one-line format: 81 characters, row by row, with a '.' for each hidden (negative or zero) value.
+
+    Parameters
+    ----------
+    puzzle : np.array
+        A 9x9 puzzle matrix.
+
+    Return
+    ------
+    An 81 character string.
+    '''
+    return ''.join(str(num) if num > 0 else '.' for num in np.asarray(puzzle).ravel().tolist())
+
+def generate_lines(count: int, seed: int, start: int = 0, strategy: str = 'placement', clues: int = None, symmetry: str = 'none') -> list[str]:
+    '''
+    Generates puzzles number start to start+count-1 of a run, each from its own random stream puzzle_rng(seed, index), and returns them in the one-line format (see puzzle_line()). This is the unit of work that the generate command hands to each worker process; lines are much cheaper to send back than SudokuPuzzle objects.
+
+    Parameters
+    ----------
+    count : int
+        The number of puzzles to generate.
+
+    seed : int
+        The seed of the run.
+
+    start : int, optional
+        The index of the first puzzle. Defaults to 0.
+
+    strategy : str, optional
+        The SudokuSolution strategy. Defaults to 'placement', which builds every solution from scratch. 'transform' is an order of magnitude faster, but all of its solutions are shuffles of BASE_SOLUTION, so every puzzle of the run is carved from the same grid up to isomorphism.
+
+    clues : int, optional
+        The number of clues to carve the puzzles down to. Defaults to None (see SudokuPuzzle).
+
+    symmetry : str, optional
+        The symmetry of the clue layout. Defaults to 'none'.
+
+    Return
+    ------
+    A list of count strings.
+    '''
+    return [
+        puzzle_line(SudokuPuzzle(strategy=strategy, clues=clues, symmetry=symmetry, rng=puzzle_rng(seed, index)).puzzle)
+        for index in range(start, start + count)
+    ]
+
+def generate_keyed_lines(count: int, seed: int, start: int = 0, strategy: str = 'placement', clues: int = None, symmetry: str = 'none') -> list[tuple]:
+    '''
+    Like generate_lines(), but pairs each line with the canonical key of its puzzle (see canonical_keys(), which canonicalizes the whole chunk at once), so that the process collecting the lines can drop isomorphic puzzles with a DedupIndex without canonicalizing them itself.
+
+    Parameters
+    ----------
+    See generate_lines().
+
+    Return
+    ------
+    A list of count (key, line) tuples.
+    '''
+    puzzles = np.array([
+        SudokuPuzzle(strategy=strategy, clues=clues, symmetry=symmetry, rng=puzzle_rng(seed, index)).puzzle
+        for index in range(start, start + count)
+    ]).reshape(-1, 9, 9)
+    return list(zip(canonical_keys(puzzles), map(puzzle_line, puzzles)))
+
+def generate_records(count: int, seed: int, start: int = 0, strategy: str = 'placement', clues: int = None, symmetry: str = 'none') -> list[tuple]:
+    '''
+    Like generate_keyed_lines(), but also grades the puzzles and returns their matrices, for storing them in a Catalogue (see sudoku_catalogue.py).
+
+    Parameters
+    ----------
+    See generate_lines().
+
+    Return
+    ------
+    A list of count (key, line, puzzle, rating, index) tuples, where puzzle is the 9x9 puzzle matrix with the hidden values negated and index the index of the puzzle in the run.
+    '''
+    puzzles, ratings = [], []
+    for index in range(start, start + count):
+        sudoku_puzzle = SudokuPuzzle(strategy=strategy, clues=clues, symmetry=symmetry, rng=puzzle_rng(seed, index))
+        ratings.append(sudoku_puzzle.grade_puzzle().rating)
+        puzzles.append(sudoku_puzzle.puzzle.astype(np.int8))
+    puzzles = np.array(puzzles).reshape(-1, 9, 9)
+    return list(zip(canonical_keys(puzzles), map(puzzle_line, puzzles), puzzles, ratings, range(start, start + count)))
+
+def positive_int(text: str) -> int:
+    '''
+    Parses a command line option that must be a whole number of at least 1.
+
+    Parameters
+    ----------
+    text : str
+        The value of the option.
+
+    Return
+    ------
+    The number (int).
+    '''
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, not {value}')
+    return value
+
+def non_negative_int(text: str) -> int:
+    '''
+    Parses a command line option that must be a whole number of at least 0.
+
+    Parameters
+    ----------
+    text : str
+        The value of the option.
+
+    Return
+    ------
+    The number (int).
+    '''
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f'must be at least 0, not {value}')
+    return value
+
+def main(argv: list[str] = None) -> None:
+    '''
+    The command line entry point. The generate command writes puzzles in the one-line format, generating them in a pool of worker processes and writing each chunk as soon as it is available, so memory use does not grow with the number of puzzles. Throughput is reported on stderr. With --catalogue, the puzzles are also graded and stored in a Catalogue, which the sample command reads from.
+
+        python sudoku.py generate -n 1000000 -j 16 -o out.txt
+        python sudoku.py generate -n 10000 --clues 24 --catalogue puzzles.db -o /dev/null
+        python sudoku.py sample puzzles.db -d hard -k 10
+
+    Parameters
+    ----------
+    argv : list, optional
+        The command line arguments. Defaults to None (sys.argv[1:]).
+
+    Return
+    ------
+    None
+    '''
+    parser = argparse.ArgumentParser(prog='sudoku.py', description='Generate Sudoku puzzles.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    gen = commands.add_parser('generate', help='generate puzzles in the one-line format')
+    gen.add_argument('-n', '--count', type=non_negative_int, default=1, help='number of puzzles (default: 1)')
+    gen.add_argument('-j', '--jobs', type=positive_int, default=None, help='number of worker processes (default: one per CPU)')
+    gen.add_argument('-o', '--output', default='-', help="output file, or '-' for stdout (default: -)")
+    gen.add_argument('-c', '--chunk-size', type=positive_int, default=100, help='puzzles per task (default: 100)')
+    gen.add_argument('--unordered', action='store_true', help='write chunks as they finish instead of in order')
+    gen.add_argument('--strategy', choices=SudokuSolution.strategies, default='placement', help='solution strategy; transform is much faster but shuffles a single grid (default: placement)')
+    gen.add_argument('--clues', type=int, default=None, help='carve puzzles down to this many clues')
+    gen.add_argument('--symmetry', choices=SYMMETRIES, default='none', help='clue layout symmetry (default: none)')
+    gen.add_argument('--unique', action='store_true', help='drop puzzles isomorphic to one already written')
+    gen.add_argument('--seed', type=int, default=None, help='seed of the run; puzzle i is reproducible from (seed, i) (default: random)')
+    gen.add_argument('--catalogue', default=None, help='also grade the puzzles and store them in this catalogue database')
+
+    smp = commands.add_parser('sample', help='write unserved puzzles from a catalogue in the one-line format')
+    smp.add_argument('catalogue', help='catalogue database')
+    smp.add_argument('-d', '--difficulty', choices=tuple(DIFFICULTY_BANDS), default=None, help='difficulty band (default: any)')
+    smp.add_argument('-k', '--count', type=non_negative_int, default=1, help='number of puzzles (default: 1)')
+    smp.add_argument('-o', '--output', default='-', help="output file, or '-' for stdout (default: -)")
+    smp.add_argument('--keep', action='store_true', help='do not mark the puzzles as served')
+    args = parser.parse_args(argv)
+
+    catalogue = None
+    if args.catalogue is not None:
+        # imported here since sudoku_catalogue imports this module (see the end of the file for running it as a script)
+        from sudoku_catalogue import Catalogue
+        catalogue = Catalogue(args.catalogue)
+
+    if args.command == 'sample':
+        puzzles = catalogue.sample(args.difficulty, args.count, mark_served=not args.keep)
+        catalogue.close()
+        output = sys.stdout if args.output == '-' else open(args.output, 'w')
+        output.write(''.join(puzzle_line(puzzle) + '\n' for puzzle in puzzles))
+        if output is not sys.stdout:
+            output.close()
+        return
+
+    # a random seed is kept below 2**63, so it fits in the seed column of a catalogue
+    seed = int(np.random.SeedSequence().generate_state(1, np.uint64)[0] >> 1) if args.seed is None else args.seed
+    if catalogue is not None and not 0 <= seed < 2**63:
+        parser.error('--seed must be between 0 and 2**63 - 1 to be stored in a catalogue')
+    print(f'seed: {seed}', file=sys.stderr)
+    if args.unique:
+        # duplicates are replaced by later puzzles, so keep handing out chunks until count puzzles are written (none if no puzzles are asked for)
+        chunks = ((args.chunk_size, seed, start, args.strategy, args.clues, args.symmetry) for start in range(0, sys.maxsize if args.count > 0 else 0, args.chunk_size))
+        index = DedupIndex()
+        if catalogue is not None:
+            for key in catalogue.keys():
+                index.add_key(key)
+    else:
+        chunks = (
+            (min(args.chunk_size, args.count - start), seed, start, args.strategy, args.clues, args.symmetry)
+            for start in range(0, args.count, args.chunk_size)
+        )
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    start = reported = time.perf_counter()
+    written = dropped = streak = 0
+    try:
+        # records start with the canonical key and the line
+        worker = generate_records if catalogue is not None else generate_keyed_lines if args.unique else generate_lines
+        for lines in iter_pool(worker, chunks, jobs=args.jobs, ordered=not args.unordered):
+            if args.unique:
+                fresh = [record for record in lines if index.add_key(record[0])]
+                dropped += len(lines) - len(fresh)
+                streak = 0 if fresh else streak + len(lines)
+                # give up when the clue count and symmetry leave fewer distinct puzzles than requested
+                if streak >= 10000:
+                    print(f'\nstopping: the last {streak} puzzles were all duplicates', file=sys.stderr)
+                    break
+                lines = fresh[:args.count - written]
+                if not lines:
+                    continue
+            if catalogue is not None:
+                keys, lines, puzzles, ratings, indices = zip(*lines)
+                catalogue.add(np.array(puzzles), np.array(ratings), args.symmetry, keys=keys, seeds=seed, run_indices=indices)
+            elif args.unique:
+                lines = [line for key, line in lines]
+            output.write('\n'.join(lines) + '\n')
+            written += len(lines)
+            if written >= args.count:
+                break
+
+            # report progress at most once a second
+            now = time.perf_counter()
+            if now - reported >= 1:
+                reported = now
+                print(f'\r{written}/{args.count} puzzles, {written / (now - start):.0f} puzzles/s', end='', file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if catalogue is not None:
+            catalogue.close()
+
+    elapsed = time.perf_counter() - start
+    print(f'\r{written} puzzles in {elapsed:.1f}s ({written / max(elapsed, 1e-9):.0f} puzzles/s)', file=sys.stderr)
+    if args.unique:
+        print(f'{dropped} duplicates dropped', file=sys.stderr)
+
+if __name__ == '__main__':
+    # sudoku_catalogue and sudoku_io import this module as sudoku, so point them at this copy instead of loading a second one
+    sys.modules.setdefault('sudoku', sys.modules[__name__])
+    main()
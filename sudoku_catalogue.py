@@ -0,0 +1,297 @@
+import sqlite3
+import numpy as np
+from typing import Iterator
+from sudoku import SudokuPuzzle, canonical_keys, difficulty_band
+from sudoku_io import pack_puzzles, unpack_puzzles
+
+# the puzzles table. packed holds pack_puzzles() of the puzzle (its clues, then its solution) and canonical its canonical_key(), so isomorphic puzzles are only stored once. seed and run_index are the (seed, index) pair that puzzle_rng() regenerates the puzzle from.
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS puzzles (
+    id INTEGER PRIMARY KEY,
+    packed BLOB NOT NULL,
+    clues INTEGER NOT NULL,
+    rating REAL,
+    band TEXT,
+    symmetry TEXT NOT NULL DEFAULT 'none',
+    canonical BLOB,
+    seed INTEGER,
+    run_index INTEGER,
+    served INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS puzzles_canonical ON puzzles (canonical);
+CREATE INDEX IF NOT EXISTS puzzles_served ON puzzles (served, id);
+CREATE INDEX IF NOT EXISTS puzzles_band ON puzzles (band, served, id);
+CREATE INDEX IF NOT EXISTS puzzles_clues ON puzzles (clues, served, id);
+CREATE INDEX IF NOT EXISTS puzzles_symmetry ON puzzles (symmetry, served, id);
+CREATE INDEX IF NOT EXISTS puzzles_rating ON puzzles (rating, id);
+'''
+
+class Catalogue:
+    '''
+    A SQLite database of puzzles that can be queried by clue count, difficulty band or rating, symmetry, canonical form and whether the puzzle has been served. Every query has an index that covers it (the rowid id is part of every index), so the table itself is only read for the puzzles that are returned.
+
+    The database runs in WAL mode, so readers (e.g., the GUI) are not blocked while a generator adds puzzles. A connection belongs to the thread that opened the catalogue, so each thread opens its own Catalogue.
+
+    Attributes
+    ----------
+    path : str
+        The path of the database file.
+
+    connection : sqlite3.Connection
+        The connection to the database.
+
+    rng : np.random.Generator
+        Picks the starting points of sample().
+
+    Methods
+    -------
+    add(puzzles, ratings=None, symmetry='none', keys=None, seeds=None, run_indices=None):
+        Adds a batch of puzzle matrices in one transaction.
+
+    add_puzzles(sudoku_puzzles, seeds=None):
+        Adds a batch of SudokuPuzzle objects.
+
+    find(clues=None, band=None, min_rating=None, max_rating=None, symmetry=None, canonical=None, unserved=False, limit=None):
+        Returns the ids of the puzzles that match.
+
+    get(ids):
+        Returns the puzzle matrices with the given ids.
+
+    sample(difficulty=None, k=1, mark_served=True):
+        Returns k unserved puzzles starting from a random id.
+
+    mark_served(ids):
+        Marks puzzles as served.
+
+    keys():
+        Iterates over the canonical keys of the stored puzzles.
+
+    close():
+        Closes the connection.
+    '''
+    def __init__(self, path: str, rng: np.random.Generator | int = None) -> None:
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self.rng = np.random.default_rng(rng)
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT count(*) FROM puzzles').fetchone()[0]
+
+    def __enter__(self) -> 'Catalogue':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add(self, puzzles: np.array, ratings: np.array = None, symmetry: str | list = 'none', keys: list = None, seeds: np.array = None, run_indices: np.array = None) -> int:
+        '''
+        Adds a batch of puzzles with one executemany() in a single transaction. Puzzles whose canonical key is already stored are skipped.
+
+        Parameters
+        ----------
+        puzzles : np.array
+            An Nx9x9 array of puzzles with the hidden values negated (i.e., SudokuPuzzle.puzzle matrices).
+
+        ratings : np.array, optional
+            The rating of each puzzle (see LogicalSolver); the band follows from it. NaN means not graded. Defaults to None (not graded).
+
+        symmetry : str or list, optional
+            The symmetry of the clue layouts, one for all or one per puzzle. Defaults to 'none'.
+
+        keys : list, optional
+            The canonical_key() of each puzzle, e.g., computed by the worker processes that generated them. Defaults to None (computed here).
+
+        seeds : np.array, optional
+            The seed of the run each puzzle was generated in (at most 2**63 - 1, SQLite's largest integer). Defaults to None (NULL).
+
+        run_indices : np.array, optional
+            The index of each puzzle in its run, so puzzle_rng(seed, index) regenerates it. Defaults to None (NULL).
+
+        Return
+        ------
+        The number of puzzles added (int).
+        '''
+        puzzles = np.asarray(puzzles).reshape(-1, 9, 9)
+        count = len(puzzles)
+        packed = np.frombuffer(pack_puzzles(puzzles), dtype=np.uint8).reshape(count, -1)
+        clues = (puzzles > 0).sum(axis=(1, 2)).tolist()
+        ratings = [None] * count if ratings is None else [None if np.isnan(rating) else float(rating) for rating in np.broadcast_to(ratings, count)]
+        bands = [None if rating is None else difficulty_band(rating) for rating in ratings]
+        symmetries = [symmetry] * count if isinstance(symmetry, str) else list(symmetry)
+        keys = canonical_keys(puzzles) if keys is None else list(keys)
+        seeds = [None] * count if seeds is None else [int(seed) for seed in np.broadcast_to(np.asarray(seeds, dtype=object), count)]
+        run_indices = [None] * count if run_indices is None else [int(index) for index in np.broadcast_to(run_indices, count)]
+        if any(seed is not None and not 0 <= seed < 2**63 for seed in seeds):
+            raise ValueError('seeds must be between 0 and 2**63 - 1 to be stored in the catalogue')
+
+        changes = self.connection.total_changes
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO puzzles (packed, clues, rating, band, symmetry, canonical, seed, run_index) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                zip((row.tobytes() for row in packed), clues, ratings, bands, symmetries, keys, seeds, run_indices),
+            )
+        return self.connection.total_changes - changes
+
+    def add_puzzles(self, sudoku_puzzles: list[SudokuPuzzle], seeds: np.array = None) -> int:
+        '''
+        Adds a batch of SudokuPuzzle objects, with their ratings if they have been graded.
+
+        Parameters
+        ----------
+        sudoku_puzzles : list
+            The SudokuPuzzle objects.
+
+        seeds : np.array, optional
+            The seed each puzzle was generated from. Defaults to None (NULL).
+
+        Return
+        ------
+        The number of puzzles added (int).
+        '''
+        ratings = [np.nan if puzzle.grade is None else puzzle.grade.rating for puzzle in sudoku_puzzles]
+        symmetries = [puzzle.symmetry for puzzle in sudoku_puzzles]
+        return self.add([puzzle.puzzle for puzzle in sudoku_puzzles], ratings, symmetries, seeds=seeds)
+
+    def find(self, clues: int = None, band: str = None, min_rating: float = None, max_rating: float = None, symmetry: str = None, canonical: bytes = None, unserved: bool = False, limit: int = None) -> list[int]:
+        '''
+        Returns the ids of the puzzles that match every given condition, in id order.
+
+        Parameters
+        ----------
+        clues : int, optional
+            The number of clues.
+
+        band : str, optional
+            The difficulty band (a key of DIFFICULTY_BANDS).
+
+        min_rating, max_rating : float, optional
+            The range of ratings, inclusive.
+
+        symmetry : str, optional
+            The symmetry of the clue layout (one of SYMMETRIES).
+
+        canonical : bytes, optional
+            The canonical_key() of a puzzle, to find the stored puzzle isomorphic to it (read from the unique index of the keys).
+
+        unserved : bool, optional
+            Only puzzles that have not been served. Defaults to False.
+
+        limit : int, optional
+            The maximum number of ids. Defaults to None (all).
+
+        Return
+        ------
+        A list of ids (int).
+        '''
+        conditions, params = [], []
+        for column, value in (('clues', clues), ('band', band), ('symmetry', symmetry), ('canonical', canonical)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if min_rating is not None:
+            conditions.append('rating >= ?')
+            params.append(min_rating)
+        if max_rating is not None:
+            conditions.append('rating <= ?')
+            params.append(max_rating)
+        if unserved:
+            conditions.append('served = 0')
+
+        query = 'SELECT id FROM puzzles'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY id'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return [row[0] for row in self.connection.execute(query, params)]
+
+    def get(self, ids: list[int]) -> np.array:
+        '''
+        Returns the puzzles with the given ids.
+
+        Parameters
+        ----------
+        ids : list
+            The ids of the puzzles.
+
+        Return
+        ------
+        An Nx9x9 array of puzzles with the hidden values negated, in the order of ids, ready for SudokuPuzzle.from_puzzle().
+        '''
+        ids = list(ids)
+        packed = {}
+        # stay below SQLite's limit on the number of query parameters
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            query = f'SELECT id, packed FROM puzzles WHERE id IN ({", ".join("?" * len(batch))})'
+            packed.update(self.connection.execute(query, batch))
+        return unpack_puzzles(b''.join(packed[idx] for idx in ids))
+
+    def sample(self, difficulty: str = None, k: int = 1, mark_served: bool = True) -> np.array:
+        '''
+        Returns k unserved puzzles without scanning the table: the ids of the first k unserved puzzles at or after a random id are read from the index of the band, wrapping around to the start if needed. Puzzles that follow a gap in the ids are a little more likely to be picked.
+
+        Parameters
+        ----------
+        difficulty : str, optional
+            The difficulty band (a key of DIFFICULTY_BANDS). Defaults to None (any puzzle).
+
+        k : int, optional
+            The number of puzzles. Defaults to 1.
+
+        mark_served : bool, optional
+            Mark the puzzles as served, so they are not sampled again. Defaults to True.
+
+        Return
+        ------
+        An array of up to k puzzles (fewer if not enough unserved puzzles are left), with the hidden values negated.
+        '''
+        max_id = self.connection.execute('SELECT max(id) FROM puzzles').fetchone()[0]
+        if max_id is None:
+            return np.zeros((0, 9, 9), dtype=np.int8)
+
+        where, params = ('band = ? AND served = 0', [difficulty]) if difficulty is not None else ('served = 0', [])
+        start = int(self.rng.integers(1, max_id + 1))
+        ids = [row[0] for row in self.connection.execute(f'SELECT id FROM puzzles WHERE {where} AND id >= ? ORDER BY id LIMIT ?', params + [start, k])]
+        if len(ids) < k:
+            ids += [row[0] for row in self.connection.execute(f'SELECT id FROM puzzles WHERE {where} AND id < ? ORDER BY id LIMIT ?', params + [start, k - len(ids)])]
+
+        puzzles = self.get(ids)
+        if mark_served:
+            self.mark_served(ids)
+        return puzzles
+
+    def mark_served(self, ids: list[int]) -> None:
+        '''
+        Marks puzzles as served.
+
+        Parameters
+        ----------
+        ids : list
+            The ids of the puzzles.
+
+        Return
+        ------
+        None
+        '''
+        with self.connection:
+            self.connection.executemany('UPDATE puzzles SET served = 1 WHERE id = ?', ((idx,) for idx in ids))
+
+    def keys(self) -> Iterator[bytes]:
+        '''
+        Iterates over the canonical keys of the stored puzzles (read from their index), e.g., to fill a DedupIndex.
+
+        Return
+        ------
+        An iterator over keys (bytes).
+        '''
+        for (key,) in self.connection.execute('SELECT canonical FROM puzzles WHERE canonical IS NOT NULL'):
+            yield key
+
+    def close(self) -> None:
+        '''Closes the connection.'''
+        self.connection.close()
@@ -0,0 +1,443 @@
+import gzip
+import os
+import sys
+import numpy as np
+from typing import Iterable, Iterator
+from sudoku import SudokuPuzzle
+
+# the header of a PuzzleBank file: magic bytes, format version and record size, padded to HEADER_SIZE bytes
+BANK_MAGIC = b'SUDOKUBK'
+BANK_VERSION = 1
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('version', '<u4'), ('record_size', '<u4')])
+HEADER_SIZE = 64
+
+# one puzzle of a PuzzleBank file. As in SudokuPuzzle.puzzle, the hidden values of the puzzle are negated.
+RECORD_DTYPE = np.dtype([
+    ('puzzle', 'i1', (9, 9)),
+    ('solution', 'u1', (9, 9)),
+    ('clues', 'u1'),
+    ('rating', '<f4'),
+    ('seed', '<u8'),
+])
+
+# the one-line format: 81 characters per puzzle, row by row, with '.' or '0' for an empty cell
+LINE_LENGTH = 81
+
+# maps each byte of a line to its value: 1-9 for a digit, 0 for an empty cell and -1 for anything else
+LINE_VALUES = np.full(256, -1, dtype=np.int8)
+LINE_VALUES[ord('1'):ord('9') + 1] = np.arange(1, 10)
+LINE_VALUES[[ord('.'), ord('0')]] = 0
+
+# the bytes that count as whitespace, so that lines of nothing else are skipped like empty lines
+LINE_BLANK = np.zeros(256, dtype=bool)
+LINE_BLANK[list(b' \t\r\n\v\f')] = True
+
+# the first bytes of a gzip file
+GZIP_MAGIC = b'\x1f\x8b'
+
+# the number of bytes read_lines() reads at a time
+READ_CHUNK_SIZE = 1 << 22
+
+def open_binary(path, mode: str = 'rb'):
+    '''
+    Opens a file for reading or writing bytes. '-' is stdin or stdout, and gzip files are decompressed on reading (recognized by their magic bytes) and compressed on writing (if the path ends in .gz).
+
+    Parameters
+    ----------
+    path : str
+        The path of the file, or '-'.
+
+    mode : str, optional
+        'rb' to read, 'wb' to write or 'ab' to append. Defaults to 'rb'.
+
+    Return
+    ------
+    A binary file object.
+    '''
+    if mode == 'rb':
+        if path == '-':
+            # stdin is left open when the gzip wrapper is closed
+            if sys.stdin.buffer.peek(2)[:2] == GZIP_MAGIC:
+                return gzip.GzipFile(fileobj=sys.stdin.buffer, mode='rb')
+            return sys.stdin.buffer
+        file = open(path, 'rb')
+        if file.peek(2)[:2] == GZIP_MAGIC:
+            # gzip.open() owns its file, so closing it closes the file too
+            file.close()
+            return gzip.open(path, 'rb')
+        return file
+    if path == '-':
+        return sys.stdout.buffer
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+def parse_lines(data: bytes) -> np.array:
+    '''
+    Parses complete lines in the one-line format into an array of puzzles, all at once. Anything after the first 81 characters of a line (e.g., a rating or a comment) is ignored, as are blank lines (empty or only whitespace) and lines starting with '#'.
+
+    Parameters
+    ----------
+    data : bytes
+        One or more complete lines, each ending with a newline.
+
+    Return
+    ------
+    An Nx9x9 int8 array with zeros for the empty cells.
+    '''
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if len(buffer) % (LINE_LENGTH + 1) == 0 and (buffer[LINE_LENGTH::LINE_LENGTH + 1] == ord('\n')).all() and (LINE_VALUES[buffer[0::LINE_LENGTH + 1]] >= 0).all():
+        # the common case: nothing but 81 characters and a newline per line, each starting like a puzzle (so none is a comment or blank)
+        lines = buffer.reshape(-1, LINE_LENGTH + 1)[:, :LINE_LENGTH]
+    else:
+        ends = np.flatnonzero(buffer == ord('\n'))
+        starts = np.concatenate([[0], ends[:-1] + 1])
+        # the number of non-whitespace bytes before each position, so a line is blank if the count does not change over it
+        filled = np.concatenate([[0], np.cumsum(~LINE_BLANK[buffer])])
+        skip = (filled[ends] == filled[starts]) | (buffer[np.minimum(starts, len(buffer) - 1)] == ord('#'))
+        starts, ends = starts[~skip], ends[~skip]
+        short = ends - starts < LINE_LENGTH
+        if short.any():
+            bad = short.argmax()
+            raise ValueError(f'puzzle line shorter than {LINE_LENGTH} characters: {data[starts[bad]:ends[bad]].decode(errors="replace")!r}')
+        lines = buffer[starts[:, None] + np.arange(LINE_LENGTH)]
+
+    values = LINE_VALUES[lines]
+    if (values < 0).any():
+        bad = np.flatnonzero((values < 0).any(axis=1))[0]
+        raise ValueError(f'invalid puzzle line: {lines[bad].tobytes().decode(errors="replace")!r}')
+    return values.reshape(-1, 9, 9)
+
+def read_lines(source, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[np.array]:
+    '''
+    Reads a file in the one-line format chunk by chunk, so files of any size are read in constant memory. Each chunk of complete lines is parsed at once with parse_lines().
+
+    Parameters
+    ----------
+    source : str or file object
+        The path of the file ('-' for stdin, gzip files are decompressed), or a binary file object.
+
+    chunk_size : int, optional
+        The number of bytes to read at a time. Defaults to READ_CHUNK_SIZE.
+
+    Return
+    ------
+    An iterator over Nx9x9 int8 arrays with zeros for the empty cells.
+    '''
+    file = open_binary(source) if isinstance(source, str) else source
+    try:
+        rest = b''
+        while True:
+            data = file.read(chunk_size)
+            if not data:
+                break
+            data = rest + data
+            end = data.rfind(b'\n') + 1
+            data, rest = data[:end], data[end:]
+            if data:
+                yield parse_lines(data)
+        if rest.strip():
+            yield parse_lines(rest + b'\n')
+    finally:
+        if isinstance(source, str) and source != '-':
+            file.close()
+
+def iter_lines(source, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[np.array]:
+    '''
+    Like read_lines(), but yields the puzzles one at a time.
+
+    Parameters
+    ----------
+    See read_lines().
+
+    Return
+    ------
+    An iterator over 9x9 int8 arrays with zeros for the empty cells.
+    '''
+    for puzzles in read_lines(source, chunk_size):
+        yield from puzzles
+
+def format_lines(puzzles: np.array) -> bytes:
+    '''
+    Formats puzzles in the one-line format, all at once. Zero and negative values (i.e., the hidden values of SudokuPuzzle.puzzle) are written as '.'.
+
+    Parameters
+    ----------
+    puzzles : np.array
+        A 9x9 or Nx9x9 array of puzzles.
+
+    Return
+    ------
+    The lines (bytes), each ending with a newline.
+    '''
+    puzzles = np.asarray(puzzles).reshape(-1, LINE_LENGTH)
+    lines = np.full((len(puzzles), LINE_LENGTH + 1), ord('\n'), dtype=np.uint8)
+    lines[:, :LINE_LENGTH] = np.where(puzzles > 0, puzzles + ord('0'), ord('.'))
+    return lines.tobytes()
+
+def write_lines(destination, puzzles: Iterable[np.array]) -> int:
+    '''
+    Writes puzzles in the one-line format as they come, so a generator of any length is written in constant memory.
+
+    Parameters
+    ----------
+    destination : str or file object
+        The path of the file ('-' for stdout, compressed if it ends in .gz), or a binary file object.
+
+    puzzles : iterable
+        9x9 or Nx9x9 arrays of puzzles (e.g., SudokuPuzzle.puzzle matrices or the chunks of read_lines()).
+
+    Return
+    ------
+    The number of puzzles written (int).
+    '''
+    file = open_binary(destination, 'wb') if isinstance(destination, str) else destination
+    count = 0
+    try:
+        for batch in puzzles:
+            data = format_lines(batch)
+            file.write(data)
+            count += len(data) // (LINE_LENGTH + 1)
+    finally:
+        if isinstance(destination, str) and destination != '-':
+            file.close()
+        else:
+            file.flush()
+    return count
+
+# the packed format: two cells per byte (the first in the high nibble), so 81 cells and a zero nibble of padding take PACKED_SIZE bytes
+PACKED_SIZE = 41
+
+def pack(grids: np.array) -> bytes:
+    '''
+    Packs grids into the packed format, all at once. Zero and negative values (i.e., the hidden values of SudokuPuzzle.puzzle) are packed as 0, so a puzzle packs to its clues and a solution to all 81 values. Values above 9 raise a ValueError, as unpack() would not read them back.
+
+    Parameters
+    ----------
+    grids : np.array
+        A 9x9 or Nx9x9 array of values.
+
+    Return
+    ------
+    N*PACKED_SIZE bytes.
+    '''
+    grids = np.asarray(grids).reshape(-1, 81)
+    if (grids > 9).any():
+        raise ValueError('grids contain values above 9')
+    cells = np.zeros((len(grids), 2*PACKED_SIZE), dtype=np.uint8)
+    cells[:, :81] = np.maximum(grids, 0)
+    return ((cells[:, 0::2] << 4) | cells[:, 1::2]).tobytes()
+
+def unpack(data: bytes) -> np.array:
+    '''
+    Unpacks grids from the packed format, all at once.
+
+    Parameters
+    ----------
+    data : bytes
+        N*PACKED_SIZE bytes, as returned by pack().
+
+    Return
+    ------
+    An Nx9x9 int8 array with zeros for the empty cells.
+    '''
+    packed = np.frombuffer(data, dtype=np.uint8)
+    if len(packed) % PACKED_SIZE:
+        raise ValueError(f'packed data must be a multiple of {PACKED_SIZE} bytes, not {len(packed)}')
+    packed = packed.reshape(-1, PACKED_SIZE)
+    cells = np.empty((len(packed), 2*PACKED_SIZE), dtype=np.int8)
+    cells[:, 0::2] = packed >> 4
+    cells[:, 1::2] = packed & 0x0F
+    if (cells > 9).any():
+        raise ValueError('packed data contains values above 9')
+    return cells[:, :81].reshape(-1, 9, 9)
+
+def pack_puzzles(puzzles: np.array) -> bytes:
+    '''
+    Packs puzzle matrices with the hidden values negated (i.e., SudokuPuzzle.puzzle) as their clues followed by their solution, 2*PACKED_SIZE bytes per puzzle.
+
+    Parameters
+    ----------
+    puzzles : np.array
+        A 9x9 or Nx9x9 array of puzzles with the hidden values negated.
+
+    Return
+    ------
+    N*2*PACKED_SIZE bytes.
+    '''
+    puzzles = np.asarray(puzzles).reshape(-1, 9, 9)
+    clues = np.frombuffer(pack(puzzles), dtype=np.uint8).reshape(-1, PACKED_SIZE)
+    solutions = np.frombuffer(pack(np.abs(puzzles)), dtype=np.uint8).reshape(-1, PACKED_SIZE)
+    return np.hstack([clues, solutions]).tobytes()
+
+def unpack_puzzles(data: bytes) -> np.array:
+    '''
+    Unpacks puzzles packed by pack_puzzles() back into puzzle matrices with the hidden values negated, ready for SudokuPuzzle.from_puzzle().
+
+    Parameters
+    ----------
+    data : bytes
+        N*2*PACKED_SIZE bytes, as returned by pack_puzzles().
+
+    Return
+    ------
+    An Nx9x9 int8 array.
+    '''
+    packed = np.frombuffer(data, dtype=np.uint8)
+    if len(packed) % (2*PACKED_SIZE):
+        raise ValueError(f'packed puzzles must be a multiple of {2*PACKED_SIZE} bytes, not {len(packed)}')
+    packed = packed.reshape(-1, 2*PACKED_SIZE)
+    clues = unpack(packed[:, :PACKED_SIZE].tobytes())
+    solutions = unpack(packed[:, PACKED_SIZE:].tobytes())
+    return np.where(clues > 0, solutions, -solutions)
+
+class PuzzleBank:
+    '''
+    A file of fixed-size puzzle records (see RECORD_DTYPE) that is read through numpy.memmap, so that any record can be fetched without loading the rest of the file. The file starts with a HEADER_SIZE byte header and the number of records follows from the file size, so appending is a single write to the end of the file. The number of records and the memmap are worked out once when the bank is opened and only updated by append(), so records appended by another PuzzleBank show up once the bank is opened again.
+
+    Attributes
+    ----------
+    path : str
+        The path of the bank file.
+
+    mode : str
+        'r' to read an existing bank or 'a' to read and append, creating the file if it does not exist.
+
+    records : np.memmap
+        A read-only structured array of the records, mapped from the file.
+
+    count : int
+        The number of records.
+
+    Methods
+    -------
+    append(puzzles, solutions=None, clues=None, ratings=None, seeds=None):
+        Appends a batch of puzzles to the end of the file.
+
+    append_puzzle(sudoku_puzzle, seed=0):
+        Appends a single SudokuPuzzle.
+
+    get_puzzle(idx):
+        Returns record idx as a SudokuPuzzle, without solving it.
+    '''
+    def __init__(self, path: str, mode: str = 'r') -> None:
+        if mode not in ('r', 'a'):
+            raise ValueError(f"mode must be 'r' or 'a', not {mode!r}")
+
+        self.path = path
+        self.mode = mode
+        self._records = None
+
+        if mode == 'a' and not os.path.exists(path):
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header['magic'] = BANK_MAGIC
+            header['version'] = BANK_VERSION
+            header['record_size'] = RECORD_DTYPE.itemsize
+            with open(path, 'wb') as file:
+                file.write(header.tobytes().ljust(HEADER_SIZE, b'\0'))
+
+        with open(path, 'rb') as file:
+            data = file.read(HEADER_SIZE)
+        if len(data) < HEADER_SIZE:
+            raise ValueError(f'{path} is shorter than a puzzle bank header')
+        header = np.frombuffer(data[:HEADER_DTYPE.itemsize], dtype=HEADER_DTYPE)
+        if header['magic'][0] != BANK_MAGIC:
+            raise ValueError(f'{path} is not a puzzle bank')
+        if header['version'][0] != BANK_VERSION or header['record_size'][0] != RECORD_DTYPE.itemsize:
+            raise ValueError(f'{path} has an unsupported puzzle bank version')
+
+        self.count, partial = divmod(os.path.getsize(path) - HEADER_SIZE, RECORD_DTYPE.itemsize)
+        if partial and mode == 'a':
+            # appending after a partial record would shift every later record
+            raise ValueError(f'{path} ends with a partial record')
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, idx):
+        return self.records[idx]
+
+    @property
+    def records(self) -> np.memmap:
+        '''A read-only structured array of the records, mapped on first use and again after append().'''
+        if self._records is None:
+            if self.count == 0:
+                return np.zeros(0, dtype=RECORD_DTYPE)
+            self._records = np.memmap(self.path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(self.count,))
+        return self._records
+
+    def append(self, puzzles: np.array, solutions: np.array = None, clues: np.array = None, ratings: np.array = None, seeds: np.array = None) -> None:
+        '''
+        Appends a batch of puzzles to the end of the file.
+
+        Parameters
+        ----------
+        puzzles : np.array
+            An Nx9x9 array of puzzles with the hidden values negated (i.e., SudokuPuzzle.puzzle matrices).
+
+        solutions : np.array, optional
+            An Nx9x9 array of solutions. Defaults to None (the absolute values of the puzzles).
+
+        clues : np.array, optional
+            The number of clues of each puzzle. Defaults to None (counted from the puzzles).
+
+        ratings : np.array, optional
+            The rating of each puzzle (see LogicalSolver). Defaults to None (NaN, i.e., not graded).
+
+        seeds : np.array, optional
+            The seed each puzzle was generated from. Defaults to None (0).
+
+        Return
+        ------
+        None
+        '''
+        if self.mode != 'a':
+            raise ValueError('the puzzle bank was opened read-only')
+
+        puzzles = np.asarray(puzzles).reshape(-1, 9, 9)
+        records = np.zeros(len(puzzles), dtype=RECORD_DTYPE)
+        records['puzzle'] = puzzles
+        records['solution'] = np.abs(puzzles) if solutions is None else np.asarray(solutions).reshape(-1, 9, 9)
+        records['clues'] = (puzzles > 0).sum(axis=(1, 2)) if clues is None else clues
+        records['rating'] = np.nan if ratings is None else ratings
+        records['seed'] = 0 if seeds is None else seeds
+
+        with open(self.path, 'ab') as file:
+            file.write(records.tobytes())
+        self.count += len(records)
+        self._records = None
+
+    def append_puzzle(self, sudoku_puzzle: SudokuPuzzle, seed: int = 0) -> None:
+        '''
+        Appends a single SudokuPuzzle, with its rating if it has been graded.
+
+        Parameters
+        ----------
+        sudoku_puzzle : SudokuPuzzle
+            The puzzle to append.
+
+        seed : int, optional
+            The seed the puzzle was generated from. Defaults to 0.
+
+        Return
+        ------
+        None
+        '''
+        rating = np.nan if sudoku_puzzle.grade is None else sudoku_puzzle.grade.rating
+        self.append(sudoku_puzzle.puzzle, sudoku_puzzle.solution, ratings=rating, seeds=seed)
+
+    def get_puzzle(self, idx: int) -> SudokuPuzzle:
+        '''
+        Returns record idx as a SudokuPuzzle built from its stored puzzle and solution (see SudokuPuzzle.from_puzzle()), so nothing is solved.
+
+        Parameters
+        ----------
+        idx : int
+            The record index.
+
+        Return
+        ------
+        A SudokuPuzzle.
+        '''
+        record = self.records[idx]
+        return SudokuPuzzle.from_puzzle(record['puzzle'], record['solution'])